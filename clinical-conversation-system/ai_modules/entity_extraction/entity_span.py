@@ -0,0 +1,60 @@
+from collections.abc import Mapping
+from typing import Any, Iterator
+
+# Characters of surrounding text returned as an entity's context
+CONTEXT_WINDOW = 50
+
+
+class EntitySpan(Mapping):
+    """
+    Extracted entity stored as offsets into the transcript it came from
+
+    All spans of a document share one reference to the source text; `text`
+    and `context` are sliced only when read. It behaves like the read-only
+    dict the extractor used to return ({'text', 'label', 'start', 'end',
+    'context'}), so `span['text']`, `span.get('context')` and `dict(span)`
+    keep working.
+    """
+
+    __slots__ = ('source', 'start', 'end', 'label')
+
+    _KEYS = ('text', 'label', 'start', 'end', 'context')
+
+    def __init__(self, source: str, start: int, end: int, label: str):
+        """
+        Args:
+            source: Full text the offsets refer to (shared, not copied)
+            start: Start character offset
+            end: End character offset
+            label: Entity label, e.g. 'DISEASE' or 'VITAL_SIGNS'
+        """
+        self.source = source
+        self.start = start
+        self.end = end
+        self.label = label
+
+    @property
+    def text(self) -> str:
+        return self.source[self.start:self.end]
+
+    @property
+    def context(self) -> str:
+        return self.source[max(0, self.start - CONTEXT_WINDOW):self.end + CONTEXT_WINDOW]
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return f"EntitySpan({self.label}, {self.start}:{self.end}, {self.text!r})"
+
+    def to_dict(self) -> dict:
+        """Plain dict with the context sliced, e.g. for JSON responses"""
+        return dict(self)
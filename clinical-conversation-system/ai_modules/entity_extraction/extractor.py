@@ -1,7 +1,54 @@
 import spacy
-from typing import List, Dict, Tuple
+from spacy.pipeline import Sentencizer
+from spacy.tokens import Doc, Span
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
 from loguru import logger
-import re
+
+from ai_modules.entity_extraction.pattern_matcher import PatternMatcher
+from ai_modules.entity_extraction.gazetteer import Gazetteer, DEFAULT_TERMS_PATH
+from ai_modules.entity_extraction.entity_span import EntitySpan
+
+
+# Pipeline components whose output the extractor never reads; only doc.ents is used
+UNUSED_COMPONENTS = ("tagger", "attribute_ruler", "lemmatizer", "parser")
+
+# Where to get the default model when it is not installed
+MODEL_DOWNLOAD_URL = "https://s3-us-west-2.amazonaws.com/ai2-s2-scispacy/releases/v0.5.3/en_core_sci_sm-0.5.3.tar.gz"
+
+# Regex patterns for clinical entities the NER model does not label
+ENTITY_PATTERNS = {
+    'vital_signs': [
+        r'blood pressure.*?(\d+/\d+)',
+        r'bp.*?(\d+/\d+)',
+        r'heart rate.*?(\d+)',
+        r'pulse.*?(\d+)',
+        r'temperature.*?(\d+\.?\d*)',
+        r'temp.*?(\d+\.?\d*)',
+        r'respiratory rate.*?(\d+)',
+        r'spo2.*?(\d+)',
+        r'oxygen saturation.*?(\d+)',
+    ],
+    'medications': [
+        r'(aspirin|ibuprofen|paracetamol|metformin|lisinopril|atorvastatin|amlodipine)',
+        r'(\w+cillin)',  # Antibiotics
+        r'(\w+pril)',  # ACE inhibitors
+        r'(\w+statin)',  # Statins
+    ],
+    'symptoms': [
+        r'(pain|ache|fever|cough|nausea|vomiting|dizziness|fatigue|weakness)',
+        r'(headache|backache|stomachache)',
+        r'(shortness of breath|difficulty breathing)',
+    ],
+    'temporal': [
+        r'(\d+\s+(?:days?|weeks?|months?|years?)\s+ago)',
+        r'(since\s+\d+)',
+        r'(for\s+\d+\s+(?:days?|weeks?|months?|years?))',
+        r'(yesterday|today|last\s+\w+)',
+    ]
+}
 
 
 class ClinicalEntityExtractor:
@@ -9,63 +56,64 @@ class ClinicalEntityExtractor:
     Extract clinical entities from medical text using scispaCy
     """
 
-    def __init__(self, model_name: str = "en_core_sci_sm"):
+    def __init__(
+            self,
+            model_name: str = "en_core_sci_sm",
+            model_path: Optional[str] = None,
+            exclude: Tuple[str, ...] = UNUSED_COMPONENTS,
+            gazetteer_path: Optional[str] = DEFAULT_TERMS_PATH,
+            gazetteer_cache_path: Optional[str] = None,
+            analysis_cache_size: int = 128
+    ):
         """
         Initialize entity extractor
 
         Args:
             model_name: spaCy model name (default: en_core_sci_sm)
+            model_path: Directory of an unpacked spaCy model; takes precedence over model_name
+            exclude: Pipeline components not to load at all
+            gazetteer_path: Term<TAB>category file of known medical terms (None disables it)
+            gazetteer_cache_path: Where the compiled gazetteer is kept (default: rebuilt on every load)
+            analysis_cache_size: Documents whose parse and entities are kept for reuse
         """
+        # (Doc, entities) per text hash, so every entry point parses a document once
+        self.analysis_cache_size = analysis_cache_size
+        self._analysis_cache = OrderedDict()
+        self._analysis_cache_lock = threading.Lock()
+
+        model = model_path or model_name
         try:
-            logger.info(f"Loading spaCy model: {model_name}")
-            self.nlp = spacy.load(model_name)
-            logger.info("spaCy model loaded successfully")
-        except OSError:
-            logger.error(f"Model {model_name} not found. Installing...")
-            import subprocess
-            subprocess.run([
-                "pip", "install",
-                "https://s3-us-west-2.amazonaws.com/ai2-s2-scispacy/releases/v0.5.3/en_core_sci_sm-0.5.3.tar.gz"
-            ])
-            self.nlp = spacy.load(model_name)
+            logger.info(f"Loading spaCy model: {model} (excluding {', '.join(exclude) or 'nothing'})")
+            self.nlp = spacy.load(model, exclude=list(exclude))
+            logger.info(f"spaCy model loaded successfully: {', '.join(self.nlp.pipe_names)}")
+        except OSError as e:
+            logger.error(f"spaCy model {model} not found")
+            raise OSError(
+                f"spaCy model '{model}' is not available. Install it with "
+                f"'pip install {MODEL_DOWNLOAD_URL}' or point model_path (SPACY_MODEL_PATH) "
+                f"at an unpacked model directory."
+            ) from e
+
+        # Rule-based sentence splitter, created the first time sentences are requested
+        self._sentencizer = None
 
         # Define clinical entity patterns
         self.entity_patterns = self._create_entity_patterns()
+        self.pattern_matcher = PatternMatcher(self.entity_patterns)
+
+        # Dictionary lookup of drugs, symptoms, diseases and procedures
+        self.gazetteer = None
+        if gazetteer_path:
+            try:
+                self.gazetteer = Gazetteer.load(gazetteer_path, gazetteer_cache_path)
+            except OSError as e:
+                logger.warning(f"Gazetteer {gazetteer_path} unavailable, using patterns only: {e}")
 
     def _create_entity_patterns(self) -> Dict[str, List[str]]:
         """Create patterns for different clinical entities"""
-        return {
-            'vital_signs': [
-                r'blood pressure.*?(\d+/\d+)',
-                r'bp.*?(\d+/\d+)',
-                r'heart rate.*?(\d+)',
-                r'pulse.*?(\d+)',
-                r'temperature.*?(\d+\.?\d*)',
-                r'temp.*?(\d+\.?\d*)',
-                r'respiratory rate.*?(\d+)',
-                r'spo2.*?(\d+)',
-                r'oxygen saturation.*?(\d+)',
-            ],
-            'medications': [
-                r'(aspirin|ibuprofen|paracetamol|metformin|lisinopril|atorvastatin|amlodipine)',
-                r'(\w+cillin)',  # Antibiotics
-                r'(\w+pril)',  # ACE inhibitors
-                r'(\w+statin)',  # Statins
-            ],
-            'symptoms': [
-                r'(pain|ache|fever|cough|nausea|vomiting|dizziness|fatigue|weakness)',
-                r'(headache|backache|stomachache)',
-                r'(shortness of breath|difficulty breathing)',
-            ],
-            'temporal': [
-                r'(\d+\s+(?:days?|weeks?|months?|years?)\s+ago)',
-                r'(since\s+\d+)',
-                r'(for\s+\d+\s+(?:days?|weeks?|months?|years?))',
-                r'(yesterday|today|last\s+\w+)',
-            ]
-        }
+        return {category: list(patterns) for category, patterns in ENTITY_PATTERNS.items()}
 
-    def extract_entities(self, text: str) -> Dict[str, List[Dict]]:
+    def extract_entities(self, text: str) -> Dict[str, List[EntitySpan]]:
         """
         Extract all clinical entities from text
 
@@ -75,8 +123,101 @@ class ClinicalEntityExtractor:
         Returns:
             Dictionary of entity types and their values
         """
+        _, entities = self.analyze(text)
+        logger.info(f"Extracted {sum(len(v) for v in entities.values())} entities")
+
+        return {category: list(items) for category, items in entities.items()}
+
+    def analyze(self, text: str) -> Tuple[Doc, Dict[str, List[EntitySpan]]]:
+        """
+        Parse a document once and cache the result
+
+        Args:
+            text: Input clinical text
+
+        Returns:
+            (spaCy Doc, categorized entities); treat both as read-only
+        """
+        key = self._analysis_key(text)
+        with self._analysis_cache_lock:
+            cached = self._analysis_cache.get(key)
+            if cached is not None:
+                self._analysis_cache.move_to_end(key)
+                return cached
+
         doc = self.nlp(text)
+        analysis = (doc, self._entities_from_doc(doc, text))
+        self._remember_analysis(key, analysis)
+        return analysis
+
+    def get_sentences(self, text: str) -> List[Span]:
+        """
+        Sentence spans of a document, reusing its cached parse
 
+        The parser is not loaded, so boundaries come from spaCy's rule-based
+        sentencizer, which is only created when this is first needed.
+
+        Args:
+            text: Input clinical text
+
+        Returns:
+            Sentence spans in document order
+        """
+        doc, _ = self.analyze(text)
+        if not doc.has_annotation("SENT_START"):
+            if self._sentencizer is None:
+                self._sentencizer = Sentencizer()
+            self._sentencizer(doc)
+        return list(doc.sents)
+
+    @staticmethod
+    def _analysis_key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _remember_analysis(self, key: str, analysis: Tuple):
+        with self._analysis_cache_lock:
+            self._analysis_cache[key] = analysis
+            self._analysis_cache.move_to_end(key)
+            while len(self._analysis_cache) > self.analysis_cache_size:
+                self._analysis_cache.popitem(last=False)
+
+    def extract_entities_batch(
+            self,
+            texts: List[str],
+            batch_size: int = 32,
+            n_process: int = 1
+    ) -> List[Dict[str, List[EntitySpan]]]:
+        """
+        Extract clinical entities from many documents with nlp.pipe
+
+        Args:
+            texts: Input clinical texts
+            batch_size: Documents buffered per spaCy batch
+            n_process: Worker processes for spaCy (1 = in-process)
+
+        Returns:
+            One entity dictionary per input text, in input order
+        """
+        texts = [text or "" for text in texts]
+        keys = [self._analysis_key(text) for text in texts]
+        with self._analysis_cache_lock:
+            cached = {key: self._analysis_cache[key][1] for key in keys if key in self._analysis_cache}
+
+        missing = list(OrderedDict((key, text) for key, text in zip(keys, texts) if key not in cached).items())
+        docs = self.nlp.pipe([text for _, text in missing], batch_size=batch_size, n_process=n_process)
+        for (key, text), doc in zip(missing, docs):
+            analysis = (doc, self._entities_from_doc(doc, text))
+            self._remember_analysis(key, analysis)
+            cached[key] = analysis[1]
+
+        results = [{category: list(items) for category, items in cached[key].items()} for key in keys]
+
+        logger.info(f"Extracted {sum(len(v) for r in results for v in r.values())} entities "
+                    f"from {len(texts)} documents")
+        return results
+
+    def _entities_from_doc(self, doc, text: str) -> Dict[str, List[EntitySpan]]:
+        """Categorize NER and regex entities for one processed document"""
         entities = {
             'diseases': [],
             'symptoms': [],
@@ -90,13 +231,7 @@ class ClinicalEntityExtractor:
 
         # Extract using spaCy NER
         for ent in doc.ents:
-            entity_info = {
-                'text': ent.text,
-                'label': ent.label_,
-                'start': ent.start_char,
-                'end': ent.end_char,
-                'context': self._get_context(text, ent.start_char, ent.end_char)
-            }
+            entity_info = EntitySpan(text, ent.start_char, ent.end_char, ent.label_)
 
             # Categorize entities
             if ent.label_ in ['DISEASE', 'DISORDER']:
@@ -115,52 +250,41 @@ class ClinicalEntityExtractor:
         # Extract using regex patterns
         entities.update(self._extract_with_patterns(text))
 
+        # Extract known terms from the gazetteer
+        if self.gazetteer is not None:
+            for category, start, end in self.gazetteer.find(text):
+                entities.setdefault(category, []).append(EntitySpan(text, start, end, category.upper()))
+
         # Remove duplicates
         for category in entities:
             entities[category] = self._remove_duplicate_entities(entities[category])
 
-        logger.info(f"Extracted {sum(len(v) for v in entities.values())} entities")
-
         return entities
 
-    def _extract_with_patterns(self, text: str) -> Dict[str, List[Dict]]:
-        """Extract entities using regex patterns"""
+    def _extract_with_patterns(self, text: str) -> Dict[str, List[EntitySpan]]:
+        """Extract entities using the compiled regex patterns"""
         pattern_entities = {
             'vital_signs': [],
             'temporal': []
         }
 
-        for category, patterns in self.entity_patterns.items():
+        for category, spans in self.pattern_matcher.match(text).items():
             if category not in pattern_entities:
                 pattern_entities[category] = []
 
-            for pattern in patterns:
-                matches = re.finditer(pattern, text, re.IGNORECASE)
-                for match in matches:
-                    entity_info = {
-                        'text': match.group(0),
-                        'label': category.upper(),
-                        'start': match.start(),
-                        'end': match.end(),
-                        'context': self._get_context(text, match.start(), match.end())
-                    }
-                    pattern_entities[category].append(entity_info)
+            label = category.upper()
+            for start, end in spans:
+                pattern_entities[category].append(EntitySpan(text, start, end, label))
 
         return pattern_entities
 
-    def _get_context(self, text: str, start: int, end: int, window: int = 50) -> str:
-        """Get surrounding context for an entity"""
-        context_start = max(0, start - window)
-        context_end = min(len(text), end + window)
-        return text[context_start:context_end]
-
-    def _remove_duplicate_entities(self, entities: List[Dict]) -> List[Dict]:
+    def _remove_duplicate_entities(self, entities: List[EntitySpan]) -> List[EntitySpan]:
         """Remove duplicate entities based on text and position"""
         seen = set()
         unique_entities = []
 
         for entity in entities:
-            key = (entity['text'].lower(), entity['start'], entity['end'])
+            key = (entity.start, entity.end)
             if key not in seen:
                 seen.add(key)
                 unique_entities.append(entity)
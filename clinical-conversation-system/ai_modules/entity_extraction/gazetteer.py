@@ -0,0 +1,193 @@
+import os
+import re
+import pickle
+import hashlib
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+# Bump when the compiled layout changes so stale pickles are rebuilt
+FORMAT_VERSION = 1
+
+# Seed vocabulary shipped with the extractor
+DEFAULT_TERMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "medical_terms.tsv")
+
+# Words are maximal \w runs; punctuation and whitespace between them are ignored
+_WORD = re.compile(r'\w+')
+# What may separate the words of one multi-word term in the text ("x-ray", "john's")
+_SEPARATOR = re.compile(r"[ \t\-/'’]+")
+
+
+def _words(text: str) -> List[str]:
+    return [m.group().lower() for m in _WORD.finditer(text)]
+
+
+class Gazetteer:
+    """
+    Dictionary of medical terms compiled into a word-level trie
+
+    Terms are loaded from a TSV file with one `term<TAB>category` per line
+    (blank lines and lines starting with '#' are ignored). Matching is
+    case-insensitive, whole-word and leftmost-longest: "chest pain" wins over
+    "pain" at the same position. The words of a multi-word term may be
+    separated by spaces, hyphens, slashes or apostrophes, but not by line
+    breaks or sentence punctuation. A scan visits each word once and follows at
+    most one trie edge per word of the longest term, so extraction time does
+    not depend on how many terms are loaded.
+
+    When given a compiled_path, the compiled trie is pickled there and
+    reused until the source file's content changes.
+    """
+
+    def __init__(self, nodes: List[Dict[str, int]], terminals: Dict[int, Tuple[str, str]]):
+        """
+        Args:
+            nodes: Trie nodes; nodes[i] maps a word to the child node index
+            terminals: Node index -> (category, canonical term) for nodes that end a term
+        """
+        self.nodes = nodes
+        self.terminals = terminals
+
+    def __len__(self) -> int:
+        return len(self.terminals)
+
+    @classmethod
+    def build(cls, terms: List[Tuple[str, str]]) -> "Gazetteer":
+        """
+        Compile (term, category) pairs; later duplicates override earlier ones
+
+        Args:
+            terms: Terms and their entity category, e.g. ('metformin', 'medications')
+
+        Returns:
+            Compiled gazetteer
+        """
+        nodes: List[Dict[str, int]] = [{}]
+        terminals: Dict[int, Tuple[str, str]] = {}
+
+        for term, category in terms:
+            words = _words(term)
+            if not words:
+                continue
+            node = 0
+            for word in words:
+                child = nodes[node].get(word)
+                if child is None:
+                    child = len(nodes)
+                    nodes[node][word] = child
+                    nodes.append({})
+                node = child
+            terminals[node] = (category, term)
+
+        return cls(nodes, terminals)
+
+    @staticmethod
+    def read_terms(path: str) -> List[Tuple[str, str]]:
+        """Parse a term<TAB>category file"""
+        terms = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                parts = line.split('\t')
+                if len(parts) < 2 or not parts[0].strip() or not parts[1].strip():
+                    logger.warning(f"Skipping malformed gazetteer line {line_number} in {path}")
+                    continue
+                terms.append((parts[0].strip(), parts[1].strip().lower()))
+        return terms
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_TERMS_PATH, compiled_path: Optional[str] = None) -> "Gazetteer":
+        """
+        Load a gazetteer, reusing the compiled trie when the source is unchanged
+
+        Args:
+            path: Term file (TSV)
+            compiled_path: Where the pickled trie is kept (default: not persisted, so a
+                read-only install never writes next to the term file)
+
+        Returns:
+            Compiled gazetteer
+        """
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+
+        if compiled_path and os.path.exists(compiled_path):
+            try:
+                with open(compiled_path, 'rb') as f:
+                    payload = pickle.load(f)
+                if payload.get('version') == FORMAT_VERSION and payload.get('source_sha256') == digest:
+                    gazetteer = cls(payload['nodes'], payload['terminals'])
+                    logger.info(f"📖 Gazetteer loaded from {compiled_path} ({len(gazetteer)} terms)")
+                    return gazetteer
+            except Exception as e:
+                logger.warning(f"Compiled gazetteer {compiled_path} unreadable, rebuilding: {e}")
+
+        gazetteer = cls.build(cls.read_terms(path))
+        if compiled_path:
+            gazetteer.save(compiled_path, digest)
+        logger.info(f"📖 Gazetteer compiled from {path} ({len(gazetteer)} terms, {len(gazetteer.nodes)} nodes)")
+        return gazetteer
+
+    def save(self, compiled_path: str, source_sha256: str):
+        """Pickle the trie; failures only cost a rebuild on the next start"""
+        tmp_path = compiled_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(compiled_path)), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({
+                    'version': FORMAT_VERSION,
+                    'source_sha256': source_sha256,
+                    'nodes': self.nodes,
+                    'terminals': self.terminals
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, compiled_path)
+        except OSError as e:
+            logger.warning(f"Could not persist compiled gazetteer to {compiled_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def find(self, text: str) -> List[Tuple[str, int, int]]:
+        """
+        Scan text for known terms
+
+        Args:
+            text: Input text
+
+        Returns:
+            (category, start, end) for each match, left to right, non-overlapping
+        """
+        words = [(m.group().lower(), m.start(), m.end()) for m in _WORD.finditer(text)]
+        nodes = self.nodes
+        terminals = self.terminals
+        root = nodes[0]
+
+        matches = []
+        i = 0
+        while i < len(words):
+            node = root.get(words[i][0])
+            if node is None:
+                i += 1
+                continue
+
+            longest = None
+            j = i
+            while True:
+                if node in terminals:
+                    longest = (node, j)
+                j += 1
+                if j == len(words):
+                    break
+                node = nodes[node].get(words[j][0])
+                if node is None or not _SEPARATOR.fullmatch(text, words[j - 1][2], words[j][1]):
+                    break
+
+            if longest is None:
+                i += 1
+                continue
+
+            node, last = longest
+            matches.append((terminals[node][0], words[i][1], words[last][2]))
+            i = last + 1
+
+        return matches
@@ -0,0 +1,170 @@
+from bisect import bisect_left, bisect_right
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Tuple
+from loguru import logger
+
+from ai_modules.entity_extraction.entity_span import EntitySpan
+
+
+def _line_starts(lines: List[str]) -> List[int]:
+    """Character offset of every line start, plus the total length"""
+    starts = [0]
+    for line in lines:
+        starts.append(starts[-1] + len(line))
+    return starts
+
+
+class LineDiff:
+    """
+    Line-level diff between two versions of a transcript
+
+    Changed lines are grouped into windows of old-text lines; every line
+    outside a window is identical in both versions, which is what lets
+    offsets there be shifted instead of re-extracted.
+    """
+
+    def __init__(self, old_text: str, new_text: str):
+        old_lines = old_text.splitlines(keepends=True)
+        new_lines = new_text.splitlines(keepends=True)
+        self.old_starts = _line_starts(old_lines)
+        self.new_starts = _line_starts(new_lines)
+        self.opcodes = SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_opcodes()
+        # (old_first, old_stop, new_first) of the unchanged blocks
+        self.equal = [(i1, i2, j1) for tag, i1, i2, j1, _ in self.opcodes if tag == 'equal']
+        self._equal_firsts = [block[0] for block in self.equal]
+
+    def windows(self, context_lines: int = 1) -> List[List[int]]:
+        """
+        Changed old-text line ranges, each widened by `context_lines`
+        unchanged lines per side; ranges that touch are merged
+
+        Returns:
+            [old_first, old_stop] ranges, in order
+        """
+        old_count = len(self.old_starts) - 1
+        windows = [
+            [max(0, i1 - context_lines), min(old_count, i2 + context_lines)]
+            for tag, i1, i2, _, _ in self.opcodes if tag != 'equal'
+        ]
+        return merge_windows(windows)
+
+    def new_line(self, line: int, is_stop: bool) -> int:
+        """
+        New-text line matching an old-text window boundary
+
+        A boundary sits in an unchanged block or at the end of the text; a
+        start maps through the block that ends there, a stop through the
+        block that begins there, so edits at the boundary fall inside.
+        """
+        if is_stop:
+            # Last unchanged block starting at or before the boundary
+            index = bisect_right(self._equal_firsts, line) - 1
+            if index >= 0 and line < self.equal[index][1]:
+                first, _, new_first = self.equal[index]
+                return new_first + line - first
+            return len(self.new_starts) - 1
+        # Last unchanged block starting before the boundary
+        index = bisect_left(self._equal_firsts, line) - 1
+        if index >= 0 and line <= self.equal[index][1]:
+            first, _, new_first = self.equal[index]
+            return new_first + line - first
+        return 0
+
+
+def merge_windows(windows: List[List[int]]) -> List[List[int]]:
+    """Merge sorted [first, stop] ranges that overlap or touch"""
+    merged: List[List[int]] = []
+    for window in windows:
+        if merged and window[0] <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], window[1])
+        else:
+            merged.append(list(window))
+    return merged
+
+
+def plan_entity_update(
+        extractor,
+        old_text: str,
+        new_text: str,
+        stored: Iterable[Tuple[str, int, int]],
+        context_lines: int = 1
+) -> Dict:
+    """
+    Work out how stored entities change when a transcript is edited
+
+    Only the changed lines (plus context) are sent through the extractor.
+    Stored entities outside them keep their rows and are shifted by the
+    length change of the edits before them; entities inside them are
+    replaced by the fresh extraction. A window is widened to whole lines
+    until no stored entity straddles its edge.
+
+    Args:
+        extractor: ClinicalEntityExtractor
+        old_text: Transcript the stored offsets refer to
+        new_text: Edited transcript
+        stored: (key, start, end) of every stored entity
+        context_lines: Unchanged lines re-read around each edit
+
+    Returns:
+        {'deleted': [key], 'shifted': {key: (start, end)},
+         'inserted': {category: [EntitySpan]}, 'reparsed_chars': int}
+    """
+    stored = list(stored)
+    diff = LineDiff(old_text, new_text)
+    old_starts = diff.old_starts
+    windows = diff.windows(context_lines)
+
+    changed = bool(windows)
+    while changed:
+        changed = False
+        for window in windows:
+            char_start, char_stop = old_starts[window[0]], old_starts[window[1]]
+            for _, start, end in stored:
+                if start < char_start < end or start < char_stop < end:
+                    window[0] = min(window[0], bisect_right(old_starts, start) - 1)
+                    window[1] = max(window[1], bisect_right(old_starts, end - 1))
+                    char_start, char_stop = old_starts[window[0]], old_starts[window[1]]
+                    changed = True
+        windows = merge_windows(windows)
+
+    old_spans = [(old_starts[first], old_starts[stop]) for first, stop in windows]
+    new_spans = [
+        (diff.new_starts[diff.new_line(first, False)], diff.new_starts[diff.new_line(stop, True)])
+        for first, stop in windows
+    ]
+
+    deleted: List[str] = []
+    shifted: Dict[str, Tuple[int, int]] = {}
+    window_stops = [stop for _, stop in old_spans]
+    # Length change accumulated after each window
+    offsets = [0]
+    for (old_start, old_stop), (new_start, new_stop) in zip(old_spans, new_spans):
+        offsets.append(offsets[-1] + (new_stop - new_start) - (old_stop - old_start))
+
+    for key, start, end in stored:
+        index = bisect_right(window_stops, start)
+        if index < len(old_spans) and end > old_spans[index][0]:
+            deleted.append(key)
+        elif offsets[index]:
+            shifted[key] = (start + offsets[index], end + offsets[index])
+
+    inserted: Dict[str, List[EntitySpan]] = {}
+    texts = [new_text[start:stop] for start, stop in new_spans]
+    for (offset, _), entities in zip(new_spans, extractor.extract_entities_batch(texts)):
+        for category, items in entities.items():
+            inserted.setdefault(category, []).extend(
+                EntitySpan(new_text, item['start'] + offset, item['end'] + offset, item['label'])
+                for item in items
+            )
+
+    reparsed = sum(len(text) for text in texts)
+    logger.info(f"♻️ Re-extracted {len(windows)} window(s), {reparsed}/{len(new_text)} chars: "
+                f"{len(deleted)} removed, {len(shifted)} shifted, "
+                f"{sum(len(v) for v in inserted.values())} added")
+
+    return {
+        'deleted': deleted,
+        'shifted': shifted,
+        'inserted': inserted,
+        'reparsed_chars': reparsed
+    }
@@ -0,0 +1,327 @@
+import re
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+
+# Characters that stand for themselves when reading a pattern's literal prefix
+_LITERAL_CHARS = set("abcdefghijklmnopqrstuvwxyz0123456789 ")
+_QUANTIFIERS = set("?*+{")
+
+# (\w+cillin): a word ending in a fixed suffix
+_SUFFIX_RULE = re.compile(r'^\(?\\w\+([a-z]+)\)?$')
+# (\d+\s+(?:days?|weeks?)\s+ago): a number, one word, then a fixed keyword
+_NUMBER_RULE = re.compile(r'^\(?\\d\+\\s\+\(\?:[a-z?|]+\)\\s\+([a-z]+)\)?$')
+
+# How a keyword hit turns into a candidate match start
+PREFIX = 'prefix'  # the match starts at the keyword
+SUFFIX = 'suffix'  # the match starts at the beginning of the word containing the keyword
+NUMBER = 'number'  # the match starts at the number before "<word> <keyword>"
+
+
+def _unwrap(pattern: str) -> str:
+    """Strip one group that encloses the whole pattern"""
+    if not (pattern.startswith('(') and pattern.endswith(')')):
+        return pattern
+
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+            if depth == 0 and i != len(pattern) - 1:
+                return pattern
+        i += 1
+
+    inner = pattern[1:-1]
+    return inner[2:] if inner.startswith('?:') else inner
+
+
+def _split_alternatives(pattern: str) -> List[str]:
+    """Split on top-level '|'"""
+    alternatives = []
+    depth = 0
+    in_class = False
+    start = 0
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if in_class:
+            in_class = ch != ']'
+        elif ch == '[':
+            in_class = True
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == '|' and depth == 0:
+            alternatives.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    alternatives.append(pattern[start:])
+    return alternatives
+
+
+def _literal_prefix(alternative: str) -> Tuple[str, int]:
+    """
+    Read the mandatory literal text an alternative starts with
+
+    Returns:
+        (lower-cased literal, number of pattern characters consumed)
+    """
+    prefix = []
+    i = 0
+    while i < len(alternative) and alternative[i].lower() in _LITERAL_CHARS:
+        if i + 1 < len(alternative) and alternative[i + 1] in _QUANTIFIERS:
+            if alternative[i + 1] == '+':
+                prefix.append(alternative[i].lower())
+            return ''.join(prefix), -1
+        prefix.append(alternative[i].lower())
+        i += 1
+    return ''.join(prefix), i
+
+
+def _trie_pattern(keywords: List[str]) -> str:
+    """Regex for a set of keywords factored into a prefix tree, longest match first"""
+    root: Dict = {}
+    for keyword in keywords:
+        node = root
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(root)
+
+
+def _is_word(ch: str) -> bool:
+    """Same test as re's \\w for str patterns"""
+    return ch.isalnum() or ch == '_'
+
+
+def _word_start(text: str, pos: int) -> int:
+    while pos > 0 and _is_word(text[pos - 1]):
+        pos -= 1
+    return pos
+
+
+def _number_start(text: str, keyword_start: int) -> Optional[int]:
+    """Walk back from a keyword over whitespace, one word, whitespace and a number"""
+    end = keyword_start
+    pos = end
+    while pos > 0 and text[pos - 1].isspace():
+        pos -= 1
+    if pos == end:
+        return None
+
+    end = pos
+    pos = _word_start(text, pos)
+    if pos == end:
+        return None
+
+    end = pos
+    while pos > 0 and text[pos - 1].isspace():
+        pos -= 1
+    if pos == end:
+        return None
+
+    end = pos
+    while pos > 0 and text[pos - 1].isdecimal():
+        pos -= 1
+    return pos if pos != end else None
+
+
+class PatternMatcher:
+    """
+    Case-insensitive multi-pattern matcher equivalent to running
+    re.finditer(pattern, text, re.IGNORECASE) for every pattern
+
+    Every literal keyword the patterns depend on is found in a single scan
+    with one prefix-tree regex. Each keyword hit yields a candidate
+    start for the patterns that use it, and the original regex is only
+    run anchored at those candidates, left to right and non-overlapping,
+    so the spans are exactly what finditer returns. For "keyword.*?(value)"
+    patterns a candidate is dropped without running the regex when no value
+    starts between the keyword and the end of its line, which is where the
+    lazy '.*?' used to scan to the end of long lines.
+
+    Patterns without a usable literal anchor fall back to re.finditer.
+    """
+
+    def __init__(self, patterns: Dict[str, List[str]]):
+        """
+        Compile the matcher
+
+        Args:
+            patterns: Entity category -> list of regex sources, as in ClinicalEntityExtractor
+        """
+        self._rules: List[Tuple[str, re.Pattern]] = []
+        self._fallback = set()
+        self._shiftable = set()  # Rules whose candidates are run starts and may begin at the previous match end
+        self._value_rules: Dict[int, Tuple[int, str]] = {}
+        self._value_regexes: Dict[str, re.Pattern] = {}
+        actions: Dict[str, List[Tuple[int, str]]] = {}
+
+        for category, sources in patterns.items():
+            for source in sources:
+                index = len(self._rules)
+                self._rules.append((category, re.compile(source, re.IGNORECASE)))
+                if not self._register(index, source, actions):
+                    self._fallback.add(index)
+
+        # Longest first so the alternation reports the longest keyword at each position
+        self._keywords = sorted(actions, key=len, reverse=True)
+        self._actions = [actions[keyword] for keyword in self._keywords]
+        # Shorter keywords hidden behind a longer one starting at the same position
+        self._prefix_hits = [
+            [j for j, other in enumerate(self._keywords) if other != keyword and keyword.startswith(other)]
+            for keyword in self._keywords
+        ]
+        if self._keywords:
+            # Locates hits; ASCII text is lower-cased first, where case-sensitive matching is cheaper
+            self._finder = re.compile(_trie_pattern(self._keywords), re.IGNORECASE)
+            self._ascii_finder = re.compile(_trie_pattern(self._keywords))
+            # Tells which keyword a hit is
+            self._scanner = re.compile(
+                '|'.join(f'(?P<k{i}>{re.escape(keyword)})' for i, keyword in enumerate(self._keywords)),
+                re.IGNORECASE
+            )
+        else:
+            self._scanner = None
+
+        logger.debug(f"Pattern matcher: {len(self._rules)} patterns, {len(self._keywords)} keywords, "
+                     f"{len(self._fallback)} regex fallbacks")
+
+    def _register(self, index: int, source: str, actions: Dict[str, List[Tuple[int, str]]]) -> bool:
+        """Attach a pattern to its anchor keywords; False if it has none"""
+        suffix_rule = _SUFFIX_RULE.match(source)
+        if suffix_rule:
+            actions.setdefault(suffix_rule.group(1), []).append((index, SUFFIX))
+            self._shiftable.add(index)
+            return True
+
+        number_rule = _NUMBER_RULE.match(source)
+        if number_rule:
+            actions.setdefault(number_rule.group(1), []).append((index, NUMBER))
+            self._shiftable.add(index)
+            return True
+
+        alternatives = _split_alternatives(_unwrap(source))
+        prefixes = [_literal_prefix(alternative) for alternative in alternatives]
+        if any(not prefix for prefix, _ in prefixes):
+            return False
+
+        for prefix, _ in prefixes:
+            actions.setdefault(prefix, []).append((index, PREFIX))
+
+        if len(alternatives) == 1:
+            prefix, consumed = prefixes[0]
+            rest = alternatives[0][consumed:] if consumed >= 0 else ''
+            if rest.startswith('.*?') and len(rest) > 3:
+                value = rest[3:]
+                self._value_rules[index] = (len(prefix), value)
+                self._value_regexes.setdefault(value, re.compile(f'(?={value})', re.IGNORECASE))
+        return True
+
+    def _keyword_hits(self, text: str) -> Iterator[Tuple[int, int]]:
+        """(start, keyword index) for every keyword occurrence, overlapping ones included"""
+        if text.isascii():
+            search = self._ascii_finder.search
+            haystack = text.lower()
+        else:
+            search = self._finder.search
+            haystack = text
+        identify = self._scanner.match
+
+        pos = 0
+        while True:
+            m = search(haystack, pos)
+            if m is None:
+                return
+            start = m.start()
+            keyword = int(identify(text, start).lastgroup[1:])
+            yield start, keyword
+            for shorter in self._prefix_hits[keyword]:
+                yield start, shorter
+            pos = start + 1
+
+    def match(self, text: str) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        Find all pattern matches
+
+        Args:
+            text: Input text
+
+        Returns:
+            Category -> (start, end) spans, in the order the patterns and
+            re.finditer would produce them
+        """
+        candidates: List[List[int]] = [[] for _ in self._rules]
+        if self._scanner is not None:
+            for start, keyword in self._keyword_hits(text):
+                for index, kind in self._actions[keyword]:
+                    if kind == PREFIX:
+                        candidates[index].append(start)
+                    elif kind == SUFFIX:
+                        word_start = _word_start(text, start)
+                        if word_start < start:
+                            candidates[index].append(word_start)
+                    else:
+                        number_start = _number_start(text, start)
+                        if number_start is not None:
+                            candidates[index].append(number_start)
+
+        newlines = None
+        value_starts_by_regex: Dict[str, List[int]] = {}
+        results: Dict[str, List[Tuple[int, int]]] = {}
+        for index, (category, regex) in enumerate(self._rules):
+            spans = results.setdefault(category, [])
+            if index in self._fallback:
+                spans.extend(m.span() for m in regex.finditer(text))
+                continue
+
+            value_rule = self._value_rules.get(index)
+            if value_rule is not None and candidates[index]:
+                value = value_rule[1]
+                if value not in value_starts_by_regex:
+                    value_starts_by_regex[value] = [m.start() for m in self._value_regexes[value].finditer(text)]
+                value_starts = value_starts_by_regex[value]
+                if newlines is None:
+                    newlines = [m.start() for m in re.finditer('\n', text)]
+
+            last_end = 0
+            for start in sorted(set(candidates[index])):
+                if start < last_end:
+                    if index not in self._shiftable:
+                        continue
+                    start = last_end
+
+                if value_rule is not None:
+                    value_from = start + value_rule[0]
+                    i = bisect_left(value_starts, value_from)
+                    if i == len(value_starts):
+                        break
+                    j = bisect_left(newlines, value_from)
+                    if j < len(newlines) and value_starts[i] > newlines[j]:
+                        continue
+
+                m = regex.match(text, start)
+                if m:
+                    spans.append(m.span())
+                    last_end = m.end()
+
+        return results
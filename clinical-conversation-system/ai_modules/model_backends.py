@@ -0,0 +1,36 @@
+import torch
+from loguru import logger
+
+# Inference backends selectable at model load time
+#   fp32 - plain PyTorch weights (default)
+#   int8 - PyTorch dynamic quantization of every nn.Linear (CPU only)
+#   onnx - ONNX Runtime export via the optional `optimum[onnxruntime]` package
+BACKENDS = ('fp32', 'int8', 'onnx')
+DEFAULT_BACKEND = 'fp32'
+
+
+def resolve_backend(backend: str, device: str) -> str:
+    """
+    Validate a backend name for the given device
+
+    Args:
+        backend: One of BACKENDS (case-insensitive); empty means fp32
+        device: "cpu" or "cuda"
+
+    Returns:
+        Backend that will actually be used
+    """
+    backend = (backend or DEFAULT_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend '{backend}'. Choose one of: {', '.join(BACKENDS)}")
+
+    if backend == 'int8' and device != "cpu":
+        logger.warning("⚠️ Dynamic int8 quantization only runs on CPU, keeping fp32 weights on GPU")
+        return DEFAULT_BACKEND
+    return backend
+
+
+def quantize_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """Replace the model's Linear layers with dynamically quantized int8 ones."""
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
@@ -0,0 +1,303 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+# Approximate nearest-neighbour backends for similar-case search
+#   ivf  - inverted file over k-means cells, NumPy only (default)
+#   hnsw - HNSW graph via the optional `faiss-cpu` package
+ANN_BACKENDS = ('ivf', 'hnsw')
+DEFAULT_ANN_BACKEND = 'ivf'
+
+# Rows scored per matrix product when assigning vectors to cells
+_CHUNK_ROWS = 65536
+
+
+def _nearest_cells(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for every row, in bounded-memory chunks"""
+    cells = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), _CHUNK_ROWS):
+        cells[start:start + _CHUNK_ROWS] = np.argmax(vectors[start:start + _CHUNK_ROWS] @ centroids.T, axis=1)
+    return cells
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """
+    Cluster unit vectors by cosine similarity
+
+    Args:
+        vectors: (n, dim) float32 unit vectors, n >= k
+        k: Number of clusters
+        iterations: Lloyd iterations
+        seed: Seed for the initial centroids
+
+    Returns:
+        (k, dim) float32 unit centroids
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        cells = _nearest_cells(vectors, centroids)
+        # Per-cell sums from one pass over the rows grouped by cell
+        order = np.argsort(cells, kind='stable')
+        grouped = cells[order]
+        starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+        sums = np.zeros_like(centroids)
+        sums[grouped[starts]] = np.add.reduceat(vectors[order], starts)
+        counts = np.bincount(cells, minlength=k)
+        # Re-seed empty cells from random points so every cell stays in use
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """
+    Inverted-file index over unit vectors (inner product = cosine)
+
+    Vectors are bucketed into the cell of their nearest k-means centroid. A
+    query only scores the vectors of its `nprobe` closest cells, so lookup
+    touches about nprobe / nlist of the collection. Re-adding an id replaces
+    its vector. Cells are fixed at training time; rebuild once the index has
+    grown well past the data it was trained on (see `needs_rebuild`).
+    """
+
+    def __init__(self, centroids: np.ndarray, nprobe: int = 16, trained_size: int = 0):
+        """
+        Args:
+            centroids: (nlist, dim) unit centroids
+            nprobe: Cells scanned per query (recall/latency trade-off)
+            trained_size: Number of vectors the centroids were trained on
+        """
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.nprobe = nprobe
+        self.trained_size = trained_size
+        nlist, dim = self.centroids.shape
+        self._vectors = [np.empty((0, dim), dtype=np.float32) for _ in range(nlist)]
+        self._sizes = [0] * nlist
+        self._ids: List[List[str]] = [[] for _ in range(nlist)]
+        self._where: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def train(
+            cls,
+            vectors: np.ndarray,
+            nlist: Optional[int] = None,
+            nprobe: int = 16,
+            max_train_per_cell: int = 256,
+            seed: int = 0
+    ) -> "IVFIndex":
+        """
+        Fit cells to a sample of the collection (vectors are not added)
+
+        Args:
+            vectors: (n, dim) float32 unit vectors
+            nlist: Number of cells (default ~4 * sqrt(n))
+            nprobe: Cells scanned per query
+            max_train_per_cell: Training sample size per cell
+            seed: Sampling and initialization seed
+
+        Returns:
+            Empty index ready for add()
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n = len(vectors)
+        if n == 0:
+            # Single catch-all cell: exact search until there is data to train on
+            return cls(np.zeros((1, vectors.shape[1]), dtype=np.float32), nprobe=1)
+
+        nlist = min(n, nlist or max(1, int(4 * np.sqrt(n))))
+        sample = vectors
+        if n > nlist * max_train_per_cell:
+            sample = vectors[np.random.default_rng(seed).choice(n, nlist * max_train_per_cell, replace=False)]
+        centroids = spherical_kmeans(sample, nlist, seed=seed)
+        logger.info(f"🗂️ IVF index trained: {nlist} cells on {len(sample)} of {n} vectors")
+        return cls(centroids, nprobe=min(nprobe, nlist), trained_size=n)
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    @property
+    def needs_rebuild(self) -> bool:
+        """Cells were trained on far fewer vectors than the index now holds"""
+        return len(self) > max(4 * self.trained_size, 1024)
+
+    def add(self, ids: List[str], vectors: np.ndarray):
+        """Insert unit vectors; an id that is already indexed is replaced"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        cells = _nearest_cells(vectors, self.centroids)
+        with self._lock:
+            for item_id, cell, vector in zip(ids, cells, vectors):
+                if item_id in self._where:
+                    self._remove(item_id)
+                size = self._sizes[cell]
+                if size == len(self._vectors[cell]):
+                    grown = np.empty((max(8, 2 * size), self.centroids.shape[1]), dtype=np.float32)
+                    grown[:size] = self._vectors[cell][:size]
+                    self._vectors[cell] = grown
+                self._vectors[cell][size] = vector
+                self._ids[cell].append(item_id)
+                self._sizes[cell] = size + 1
+                self._where[item_id] = (cell, size)
+
+    def remove(self, item_id: str):
+        with self._lock:
+            if item_id in self._where:
+                self._remove(item_id)
+
+    def _remove(self, item_id: str):
+        # Move the cell's last row into the hole
+        cell, row = self._where.pop(item_id)
+        last = self._sizes[cell] - 1
+        if row != last:
+            moved = self._ids[cell][last]
+            self._vectors[cell][row] = self._vectors[cell][last]
+            self._ids[cell][row] = moved
+            self._where[moved] = (cell, row)
+        self._ids[cell].pop()
+        self._sizes[cell] = last
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Approximate top-k by inner product
+
+        Args:
+            query: (dim,) unit vector
+            k: Number of results
+            nprobe: Override the index's cells-per-query
+
+        Returns:
+            (id, score) pairs, best first
+        """
+        query = np.asarray(query, dtype=np.float32)
+        nlist = len(self.centroids)
+        nprobe = min(nprobe or self.nprobe, nlist)
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe] if nprobe < nlist else range(nlist)
+
+        with self._lock:
+            ids: List[str] = []
+            scores = []
+            for cell in probe:
+                size = self._sizes[cell]
+                if size:
+                    scores.append(self._vectors[cell][:size] @ query)
+                    ids.extend(self._ids[cell])
+        if not ids:
+            return []
+
+        scores = np.concatenate(scores)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(ids[i], float(scores[i])) for i in top]
+
+
+class HNSWIndex:
+    """
+    HNSW graph index backed by faiss (optional dependency: pip install faiss-cpu)
+
+    faiss labels are positions in `_ids`. HNSW cannot delete, so re-adding an
+    id appends a new node and the superseded one is filtered out of results.
+    """
+
+    def __init__(self, dim: int, m: int = 32, ef_construction: int = 200, ef_search: int = 64):
+        """
+        Args:
+            dim: Vector dimension
+            m: Graph neighbours per node
+            ef_construction: Candidate list size while building
+            ef_search: Candidate list size per query (recall/latency trade-off)
+        """
+        import faiss
+
+        self._index = faiss.IndexHNSWFlat(dim, m, faiss.METRIC_INNER_PRODUCT)
+        self._index.hnsw.efConstruction = ef_construction
+        self._index.hnsw.efSearch = ef_search
+        self._ids: List[str] = []
+        self._label_of: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._label_of)
+
+    @property
+    def needs_rebuild(self) -> bool:
+        """Superseded nodes make up most of the graph"""
+        return len(self._ids) > max(2 * len(self), 1024)
+
+    def add(self, ids: List[str], vectors: np.ndarray):
+        """Insert unit vectors; an id that is already indexed is replaced"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            self._index.add(vectors)
+            for item_id in ids:
+                self._label_of[item_id] = len(self._ids)
+                self._ids.append(item_id)
+
+    def remove(self, item_id: str):
+        """The node stays in the graph but is filtered out of results, like a superseded one"""
+        with self._lock:
+            self._label_of.pop(item_id, None)
+
+    def search(self, query: np.ndarray, k: int = 10, ef_search: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Approximate top-k by inner product
+
+        Args:
+            query: (dim,) unit vector
+            k: Number of results
+            ef_search: Override the candidate list size
+
+        Returns:
+            (id, score) pairs, best first
+        """
+        query = np.ascontiguousarray(query, dtype=np.float32).reshape(1, -1)
+        with self._lock:
+            if ef_search:
+                self._index.hnsw.efSearch = ef_search
+            # Over-fetch by the number of superseded nodes so k live results remain
+            fetch = min(len(self._ids), k + len(self._ids) - len(self._label_of))
+            if fetch == 0:
+                return []
+            scores, labels = self._index.search(query, fetch)
+            results = []
+            for label, score in zip(labels[0], scores[0]):
+                if label < 0:
+                    continue
+                item_id = self._ids[label]
+                if self._label_of.get(item_id) == label:
+                    results.append((item_id, float(score)))
+        return results[:k]
+
+
+def build_index(ids: List[str], vectors: np.ndarray, backend: str = DEFAULT_ANN_BACKEND, **options):
+    """
+    Build a similar-case index over unit vectors
+
+    Args:
+        ids: Item id per row
+        vectors: (n, dim) float32 unit vectors
+        backend: One of ANN_BACKENDS (case-insensitive)
+        **options: Passed to IVFIndex.train or HNSWIndex
+
+    Returns:
+        IVFIndex or HNSWIndex
+    """
+    backend = (backend or DEFAULT_ANN_BACKEND).lower()
+    if backend not in ANN_BACKENDS:
+        raise ValueError(f"Unknown ANN backend '{backend}'. Choose one of: {', '.join(ANN_BACKENDS)}")
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if backend == 'hnsw':
+        index = HNSWIndex(vectors.shape[1], **options)
+    else:
+        index = IVFIndex.train(vectors, **options)
+    if len(ids):
+        index.add(ids, vectors)
+    logger.info(f"🗂️ {backend.upper()} similar-case index holds {len(index)} vectors")
+    return index
@@ -1,9 +1,21 @@
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import SentenceTransformer
 import torch
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
 from loguru import logger
 import numpy as np
 
+from ai_modules.model_backends import DEFAULT_BACKEND, resolve_backend, quantize_int8
+from ai_modules.retrieval.lexical_index import reciprocal_rank_fusion
+from ai_modules.retrieval.passages import PASSAGE_SCORING, PassageEmbeddings, passage_spans
+
+# Entity types pulled into each history section: the extractor's category
+# names plus the singular/synonym forms used by other sources
+ENTITY_TYPE_GROUPS = {
+    'relevant_diagnoses': ['diseases', 'disease', 'diagnosis', 'disorder'],
+    'relevant_medications': ['medications', 'medication', 'drug'],
+    'relevant_procedures': ['procedures', 'procedure', 'treatment']
+}
+
 
 class PatientHistoryRetriever:
     """
@@ -11,19 +23,54 @@ class PatientHistoryRetriever:
     using semantic similarity
     """
 
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(
+            self,
+            model_name: str = "all-MiniLM-L6-v2",
+            backend: str = DEFAULT_BACKEND,
+            passage_scoring: str = 'max',
+            top_n_passages: int = 3,
+            max_passage_chars: int = 500,
+            overlap_turns: int = 1
+    ):
         """
         Initialize retriever with sentence transformer
 
         Args:
             model_name: SentenceTransformer model name
+            backend: 'fp32', 'int8' (dynamic quantization, CPU) or 'onnx' (ONNX Runtime)
+            passage_scoring: 'max' (best passage) or 'mean' (mean of the top_n_passages best)
+            top_n_passages: Passages averaged per conversation in 'mean' scoring
+            max_passage_chars: Length budget of one transcript passage
+            overlap_turns: Speaker turns shared by consecutive passages
         """
-        logger.info(f"Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+        if passage_scoring not in PASSAGE_SCORING:
+            raise ValueError(f"Unknown passage scoring '{passage_scoring}'. Choose one of: {', '.join(PASSAGE_SCORING)}")
+        self.passage_scoring = passage_scoring
+        self.top_n_passages = top_n_passages
+        self.max_passage_chars = max_passage_chars
+        self.overlap_turns = overlap_turns
+
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.model.to(self.device)
+        self.model_name = model_name
+        self.backend = resolve_backend(backend, self.device)
+        logger.info(f"Loading embedding model: {model_name} ({self.backend})")
+
+        if self.backend == 'onnx':
+            # Requires sentence-transformers[onnx]; exports the model on first load
+            self.model = SentenceTransformer(model_name, backend="onnx")
+        else:
+            self.model = SentenceTransformer(model_name, device=self.device)
+            if self.backend == 'int8':
+                self.model = quantize_int8(self.model)
         logger.info(f"Embedding model loaded on {self.device}")
 
+    @property
+    def cache_name(self) -> str:
+        """Model identity for stored embeddings; non-fp32 backends produce slightly different vectors."""
+        if self.backend == DEFAULT_BACKEND:
+            return self.model_name
+        return f"{self.model_name}:{self.backend}"
+
     def encode_texts(self, texts: List[str]) -> np.ndarray:
         """
         Encode texts into embeddings
@@ -41,11 +88,66 @@ class PatientHistoryRetriever:
         )
         return embeddings.cpu().numpy()
 
+    def conversation_passages(self, conv: Dict) -> List[str]:
+        """
+        Texts a conversation is embedded from: summary and chief complaint as
+        one passage, then the whole transcript in overlapping speaker-turn windows
+        """
+        header = ""
+        if conv.get('summary'):
+            header += conv['summary'] + " "
+        if conv.get('chief_complaint'):
+            header += "Chief complaint: " + conv['chief_complaint']
+        passages = [header.strip()] if header.strip() else []
+
+        transcript = conv.get('transcription') or ""
+        passages.extend(
+            transcript[start:end]
+            for start, end in passage_spans(transcript, self.max_passage_chars, self.overlap_turns)
+        )
+        return passages or ["No content"]
+
+    @property
+    def dimension(self) -> int:
+        # Renamed to get_embedding_dimension in newer sentence-transformers
+        dimension = getattr(self.model, 'get_embedding_dimension', None) or self.model.get_sentence_embedding_dimension
+        return dimension()
+
+    def embed_conversations(self, conversations: List[Dict]) -> PassageEmbeddings:
+        """
+        Encode every passage of the conversations in one batch
+
+        Args:
+            conversations: Conversation dicts (summary, transcription, chief_complaint)
+
+        Returns:
+            L2-normalized passage vectors with per-conversation offsets
+        """
+        passages = [self.conversation_passages(conv) for conv in conversations]
+        texts = [text for conversation in passages for text in conversation]
+        if not texts:
+            return PassageEmbeddings.stack([], self.dimension)
+
+        vectors = self._normalize(self.encode_texts(texts))
+        offsets = np.zeros(len(passages) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(conversation) for conversation in passages])
+        return PassageEmbeddings(vectors, offsets)
+
+    def _conversation_scores(self, query_embedding: np.ndarray, embeddings: PassageEmbeddings) -> np.ndarray:
+        return embeddings.scores(query_embedding, self.passage_scoring, self.top_n_passages)
+
+    @staticmethod
+    def _normalize(embeddings: np.ndarray) -> np.ndarray:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
     def find_relevant_conversations(
             self,
             query_symptoms: List[str],
             conversation_history: List[Dict],
-            top_k: int = 5
+            top_k: int = 5,
+            embeddings: Optional[PassageEmbeddings] = None
     ) -> List[Tuple[Dict, float]]:
         """
         Find most relevant past conversations based on symptoms
@@ -54,6 +156,8 @@ class PatientHistoryRetriever:
             query_symptoms: Current symptoms
             conversation_history: List of past conversations
             top_k: Number of top results to return
+            embeddings: Precomputed rows of embed_conversations(conversation_history);
+                when given only the query is encoded
 
         Returns:
             List of (conversation, similarity_score) tuples
@@ -64,41 +168,173 @@ class PatientHistoryRetriever:
         # Create query from symptoms
         query = "Patient has: " + ", ".join(query_symptoms)
 
-        # Prepare conversation texts
-        conv_texts = []
-        for conv in conversation_history:
-            # Combine summary and key entities for better matching
-            text = ""
-            if conv.get('summary'):
-                text += conv['summary'] + " "
-            if conv.get('transcription'):
-                text += conv['transcription'][:500]  # Limit length
-            if conv.get('chief_complaint'):
-                text += " Chief complaint: " + conv['chief_complaint']
-
-            conv_texts.append(text if text else "No content")
-
-        # Encode query and conversations
-        query_embedding = self.encode_texts([query])
-        conv_embeddings = self.encode_texts(conv_texts)
+        if embeddings is None:
+            embeddings = self.embed_conversations(conversation_history)
+        query_embedding = self._normalize(self.encode_texts([query]))[0]
 
-        # Calculate similarities
-        similarities = util.cos_sim(query_embedding, conv_embeddings)[0]
+        # Cosine similarity of the best passage(s): both sides are unit vectors
+        similarities = self._conversation_scores(query_embedding, embeddings)
 
         # Get top K
-        top_indices = torch.topk(similarities, min(top_k, len(similarities))).indices
+        top_indices = np.argsort(-similarities, kind='stable')[:top_k]
 
-        results = []
-        for idx in top_indices:
-            idx = idx.item()
-            results.append((
-                conversation_history[idx],
-                similarities[idx].item()
-            ))
+        results = [(conversation_history[idx], float(similarities[idx])) for idx in top_indices]
 
         logger.info(f"Found {len(results)} relevant conversations")
         return results
 
+    def find_similar_cases(
+            self,
+            query_symptoms: List[str],
+            index,
+            top_k: int = 10,
+            exclude_ids: Optional[set] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Find similar past visits across all patients
+
+        Args:
+            query_symptoms: Current symptoms
+            index: ann_index.IVFIndex or HNSWIndex over pooled conversation embeddings
+            top_k: Number of results
+            exclude_ids: Conversation ids to leave out (e.g. the patient's own visits)
+
+        Returns:
+            List of (conversation_id, similarity_score) tuples
+        """
+        exclude_ids = exclude_ids or set()
+        query = "Patient has: " + ", ".join(query_symptoms)
+        query_embedding = self._normalize(self.encode_texts([query]))[0]
+
+        hits = index.search(query_embedding, top_k + len(exclude_ids))
+        results = [(conversation_id, score) for conversation_id, score in hits if conversation_id not in exclude_ids]
+
+        logger.info(f"Found {len(results[:top_k])} similar cases")
+        return results[:top_k]
+
+    def hybrid_rank(
+            self,
+            query_symptoms: List[str],
+            lexical_hits: List[Tuple[str, float]],
+            candidate_ids: List[str],
+            candidate_embeddings: PassageEmbeddings,
+            top_k: int = 10,
+            rrf_k: int = 60
+    ) -> List[Tuple[str, float, Optional[float]]]:
+        """
+        Fuse a BM25 ranking with dense similarity over a candidate set
+
+        Args:
+            query_symptoms: Current symptoms
+            lexical_hits: (id, BM25 score) pairs, best first
+            candidate_ids: Ids to score densely (usually the lexical hits)
+            candidate_embeddings: Stored passage embeddings of candidate_ids
+            top_k: Number of results
+            rrf_k: Reciprocal rank fusion constant
+
+        Returns:
+            List of (id, fused_score, similarity_score) tuples; similarity is
+            None for lexical hits without an embedding
+        """
+        query = "Patient has: " + ", ".join(query_symptoms)
+        query_embedding = self._normalize(self.encode_texts([query]))[0]
+
+        similarities = self._conversation_scores(query_embedding, candidate_embeddings)
+        dense_ranking = [candidate_ids[i] for i in np.argsort(-similarities, kind='stable')]
+        similarity_of = dict(zip(candidate_ids, similarities.tolist()))
+
+        fused = reciprocal_rank_fusion([[item_id for item_id, _ in lexical_hits], dense_ranking], k=rrf_k)
+        return [(item_id, score, similarity_of.get(item_id)) for item_id, score in fused[:top_k]]
+
+    def find_relevant_conversations_hybrid(
+            self,
+            query_symptoms: List[str],
+            conversation_history: List[Dict],
+            lexical_index,
+            top_k: int = 5,
+            embeddings: Optional[PassageEmbeddings] = None,
+            candidate_pool: int = 100
+    ) -> List[Tuple[Dict, float, float]]:
+        """
+        Keyword prefilter, then dense re-scoring and rank fusion
+
+        The BM25 index picks up to `candidate_pool` of the patient's
+        conversations that share terms with the symptoms; only those are
+        scored densely. When fewer than top_k match (paraphrased symptoms),
+        every conversation is scored densely and fused with the keyword hits.
+
+        Args:
+            query_symptoms: Current symptoms
+            conversation_history: Conversation dicts with an 'id'
+            lexical_index: lexical_index.BM25Index over conversation ids
+            top_k: Number of results
+            embeddings: Stored rows of embed_conversations(conversation_history)
+            candidate_pool: Keyword candidates passed to the dense stage
+
+        Returns:
+            List of (conversation, similarity_score, fused_score) tuples
+        """
+        if not conversation_history:
+            return []
+
+        position = {conv['id']: i for i, conv in enumerate(conversation_history)}
+        hits = lexical_index.search(" ".join(query_symptoms), candidate_pool, allowed=set(position))
+        rows = [position[item_id] for item_id, _ in hits] if len(hits) >= top_k else list(range(len(conversation_history)))
+
+        if embeddings is not None:
+            candidate_embeddings = embeddings.select(rows)
+        else:
+            candidate_embeddings = self.embed_conversations([conversation_history[row] for row in rows])
+
+        ranked = self.hybrid_rank(
+            query_symptoms, hits, [conversation_history[row]['id'] for row in rows], candidate_embeddings, top_k
+        )
+        logger.info(f"Found {len(ranked)} relevant conversations ({len(hits)} keyword matches, {len(rows)} scored)")
+        return [(conversation_history[position[item_id]], similarity, fused) for item_id, fused, similarity in ranked]
+
+    def find_similar_cases_hybrid(
+            self,
+            query_symptoms: List[str],
+            index,
+            lexical_index,
+            load_vectors: Callable[[List[str]], Tuple[List[str], PassageEmbeddings]],
+            top_k: int = 10,
+            exclude_ids: Optional[set] = None,
+            candidate_pool: int = 200
+    ) -> List[Tuple[str, float, Optional[float]]]:
+        """
+        Similar past visits across all patients, keyword prefilter first
+
+        With at least top_k keyword matches only their stored passages are
+        loaded and scored; otherwise the ANN index (pooled vectors) supplies
+        the candidates, which are re-scored by passage and fused with
+        whatever keywords matched.
+
+        Args:
+            query_symptoms: Current symptoms
+            index: ann_index.IVFIndex or HNSWIndex over stored conversation embeddings
+            lexical_index: lexical_index.BM25Index over conversation ids
+            load_vectors: ids -> (ids found, their stored passage embeddings)
+            top_k: Number of results
+            exclude_ids: Conversation ids to leave out
+            candidate_pool: Keyword candidates passed to the dense stage
+
+        Returns:
+            List of (conversation_id, fused_score, similarity_score) tuples
+        """
+        exclude_ids = exclude_ids or set()
+        hits = lexical_index.search(" ".join(query_symptoms), candidate_pool + len(exclude_ids))
+        hits = [hit for hit in hits if hit[0] not in exclude_ids][:candidate_pool]
+
+        if len(hits) >= top_k:
+            candidates = [item_id for item_id, _ in hits]
+        else:
+            dense_hits = self.find_similar_cases(query_symptoms, index, candidate_pool, exclude_ids)
+            candidates = [item_id for item_id, _ in dense_hits]
+
+        candidate_ids, candidate_embeddings = load_vectors(candidates)
+        return self.hybrid_rank(query_symptoms, hits, candidate_ids, candidate_embeddings, top_k)
+
     def find_relevant_entities(
             self,
             query_symptoms: List[str],
@@ -118,44 +354,67 @@ class PatientHistoryRetriever:
         Returns:
             List of (entity, similarity_score) tuples
         """
-        if not entity_history:
-            return []
+        return self.find_relevant_entities_by_type(
+            query_symptoms, entity_history, {'matches': entity_types}, top_k=top_k
+        )['matches']
 
-        # Filter by entity type if specified
-        if entity_types:
-            filtered_entities = [
-                e for e in entity_history
-                if e.get('entity_type', '').lower() in [t.lower() for t in entity_types]
-            ]
-        else:
-            filtered_entities = entity_history
+    def find_relevant_entities_by_type(
+            self,
+            query_symptoms: List[str],
+            entity_history: List[Dict],
+            type_groups: Dict[str, Optional[List[str]]],
+            top_k: int = 5
+    ) -> Dict[str, List[Tuple[Dict, float]]]:
+        """
+        Rank history entities for several type filters with one encoder call
 
-        if not filtered_entities:
-            return []
+        The query and every entity matching any group are encoded in one
+        batch; each group is then a boolean mask over the same similarity
+        row, and its top-k is taken with argpartition.
 
-        # Create query
-        query = " ".join(query_symptoms)
+        Args:
+            query_symptoms: Current symptoms
+            entity_history: List of extracted entities
+            type_groups: Group name -> entity types to keep (None keeps all)
+            top_k: Results per group
 
-        # Prepare entity texts
-        entity_texts = [
-            f"{e.get('entity_type', '')}: {e.get('entity_value', '')} {e.get('context', '')}"
-            for e in filtered_entities
-        ]
+        Returns:
+            Group name -> list of (entity, similarity_score) tuples
+        """
+        results: Dict[str, List[Tuple[Dict, float]]] = {name: [] for name in type_groups}
+        if not entity_history or not type_groups:
+            return results
 
-        # Encode and find similarities
-        query_embedding = self.encode_texts([query])
-        entity_embeddings = self.encode_texts(entity_texts)
+        types = np.array([e.get('entity_type', '').lower() for e in entity_history])
+        masks = np.stack([
+            np.isin(types, [t.lower() for t in wanted]) if wanted else np.ones(len(types), dtype=bool)
+            for wanted in type_groups.values()
+        ])
 
-        similarities = util.cos_sim(query_embedding, entity_embeddings)[0]
-        top_indices = torch.topk(similarities, min(top_k, len(similarities))).indices
+        # Only entities some group asks for are encoded
+        candidates = np.flatnonzero(masks.any(axis=0))
+        if len(candidates) == 0:
+            return results
+        masks = masks[:, candidates]
 
-        results = []
-        for idx in top_indices:
-            idx = idx.item()
-            results.append((
-                filtered_entities[idx],
-                similarities[idx].item()
-            ))
+        query = " ".join(query_symptoms)
+        entity_texts = [
+            f"{e.get('entity_type', '')}: {e.get('entity_value', '')} {e.get('context', '')}"
+            for e in (entity_history[i] for i in candidates)
+        ]
+        embeddings = self._normalize(self.encode_texts([query] + entity_texts))
+        similarities = embeddings[1:] @ embeddings[0]
+
+        # (groups, candidates) scores with other types masked out
+        scores = np.where(masks, similarities, -np.inf)
+        k = min(top_k, len(candidates))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for row, name in enumerate(type_groups):
+            picked = top[row][np.argsort(-scores[row, top[row]], kind='stable')]
+            results[name] = [
+                (entity_history[candidates[i]], float(similarities[i]))
+                for i in picked if masks[row, i]
+            ]
 
         return results
 
@@ -164,7 +423,9 @@ class PatientHistoryRetriever:
             symptoms: List[str],
             patient_data: Dict,
             top_conversations: int = 5,
-            top_entities: int = 10
+            top_entities: int = 10,
+            conversation_embeddings: Optional[PassageEmbeddings] = None,
+            lexical_index=None
     ) -> Dict:
         """
         Comprehensive retrieval of patient history based on symptoms
@@ -174,6 +435,8 @@ class PatientHistoryRetriever:
             patient_data: Dictionary containing patient's historical data
             top_conversations: Number of conversations to retrieve
             top_entities: Number of entities to retrieve
+            conversation_embeddings: Stored embeddings of patient_data['conversations']
+            lexical_index: BM25Index over conversation ids; enables keyword prefilter and fusion
 
         Returns:
             Dictionary with relevant historical information
@@ -189,11 +452,24 @@ class PatientHistoryRetriever:
         }
 
         # Retrieve conversations
-        if 'conversations' in patient_data:
+        if 'conversations' in patient_data and lexical_index is not None:
+            conv_results = self.find_relevant_conversations_hybrid(
+                symptoms,
+                patient_data['conversations'],
+                lexical_index,
+                top_k=top_conversations,
+                embeddings=conversation_embeddings
+            )
+            result['relevant_conversations'] = [
+                {**conv, 'similarity_score': score, 'fusion_score': fused}
+                for conv, score, fused in conv_results
+            ]
+        elif 'conversations' in patient_data:
             conv_results = self.find_relevant_conversations(
                 symptoms,
                 patient_data['conversations'],
-                top_k=top_conversations
+                top_k=top_conversations,
+                embeddings=conversation_embeddings
             )
             result['relevant_conversations'] = [
                 {**conv, 'similarity_score': score}
@@ -202,41 +478,17 @@ class PatientHistoryRetriever:
 
         # Retrieve specific entity types
         if 'entities' in patient_data:
-            # Diagnoses
-            diagnoses = self.find_relevant_entities(
-                symptoms,
-                patient_data['entities'],
-                entity_types=['disease', 'diagnosis', 'disorder'],
-                top_k=5
-            )
-            result['relevant_diagnoses'] = [
-                {**entity, 'similarity_score': score}
-                for entity, score in diagnoses
-            ]
-
-            # Medications
-            medications = self.find_relevant_entities(
-                symptoms,
-                patient_data['entities'],
-                entity_types=['medication', 'drug'],
-                top_k=5
-            )
-            result['relevant_medications'] = [
-                {**entity, 'similarity_score': score}
-                for entity, score in medications
-            ]
-
-            # Procedures
-            procedures = self.find_relevant_entities(
+            matches = self.find_relevant_entities_by_type(
                 symptoms,
                 patient_data['entities'],
-                entity_types=['procedure', 'treatment'],
+                ENTITY_TYPE_GROUPS,
                 top_k=5
             )
-            result['relevant_procedures'] = [
-                {**entity, 'similarity_score': score}
-                for entity, score in procedures
-            ]
+            for section, entities in matches.items():
+                result[section] = [
+                    {**entity, 'similarity_score': score}
+                    for entity, score in entities
+                ]
 
         # Generate summary
         result['summary'] = self._generate_retrieval_summary(result)
@@ -0,0 +1,134 @@
+import re
+import math
+import heapq
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Words, plus numbers with separators kept whole ("120/80", "7.5")
+_TOKEN = re.compile(r"\d+(?:[./]\d+)+|\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def lexical_text(conv: Dict) -> str:
+    """Text a conversation is keyword-indexed under: full summary and transcript, complaint, entity values"""
+    parts = [conv.get('summary'), conv.get('transcription'), conv.get('chief_complaint')]
+    parts.extend(conv.get('entity_values') or [])
+    return " ".join(part for part in parts if part)
+
+
+class BM25Index:
+    """
+    Incremental inverted index with Okapi BM25 scoring
+
+    Postings hold raw term frequencies and document frequencies are read at
+    query time, so documents can be added, replaced and removed without
+    re-indexing the rest. Exact drug names and lab values that a dense
+    encoder blurs together score only on documents that contain them.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            k1: Term-frequency saturation
+            b: Document length normalization (0 = none, 1 = full)
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Dict[str, int]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_lengths
+
+    def add(self, doc_id: str, text: str):
+        """Index a document; an id that is already indexed is replaced"""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            if doc_id in self._doc_lengths:
+                self._remove(doc_id)
+            for term, count in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = count
+            self._doc_terms[doc_id] = dict(terms)
+            length = sum(terms.values())
+            self._doc_lengths[doc_id] = length
+            self._total_length += length
+
+    def add_many(self, documents: Iterable[Tuple[str, str]]):
+        for doc_id, text in documents:
+            self.add(doc_id, text)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            if doc_id in self._doc_lengths:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+
+    def search(self, query: str, k: int = 100, allowed: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Top-k documents containing at least one query term
+
+        Args:
+            query: Free text
+            k: Number of results
+            allowed: Only score these document ids (e.g. one patient's visits)
+
+        Returns:
+            (doc_id, BM25 score) pairs, best first
+        """
+        terms = set(tokenize(query))
+        scores: Dict[str, float] = {}
+        with self._lock:
+            n = len(self._doc_lengths)
+            if n == 0:
+                return []
+            average_length = self._total_length / n
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Combine ranked id lists: score(id) = sum over lists of 1 / (k + rank)
+
+    Only ranks are used, so BM25 and cosine scores need no calibration. An
+    id missing from a list simply gets nothing from it.
+
+    Args:
+        rankings: Id lists, best first
+        k: Damping constant; larger values flatten the head of each list
+
+    Returns:
+        (id, fused score) pairs, best first
+    """
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, 1):
+            fused[item_id] = fused.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
@@ -0,0 +1,167 @@
+import re
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# A turn starts at a speaker label at the beginning of a line ("Doctor:", " Patient:", "Dr. Lee:")
+_SPEAKER_LABEL = re.compile(r"^[ \t]*[A-Z][\w .']{0,30}:", re.M)
+_SENTENCE_END = re.compile(r"(?<=[.?!])\s+")
+
+PASSAGE_SCORING = ('max', 'mean')
+
+
+def _trim(text: str, start: int, end: int) -> Tuple[int, int]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _split_long(text: str, start: int, end: int, max_chars: int) -> List[Tuple[int, int]]:
+    """Break an over-long turn at sentence ends, hard-cutting sentences that still do not fit"""
+    pieces = []
+    piece_start = start
+    cuts = [m.end() for m in _SENTENCE_END.finditer(text, start, end)] + [end]
+    previous = start
+    for cut in cuts:
+        if cut - piece_start > max_chars and previous > piece_start:
+            pieces.append((piece_start, previous))
+            piece_start = previous
+        while cut - piece_start > max_chars:
+            pieces.append((piece_start, piece_start + max_chars))
+            piece_start += max_chars
+        previous = cut
+    pieces.append((piece_start, end))
+    return [span for span in (_trim(text, s, e) for s, e in pieces) if span[1] > span[0]]
+
+
+def turn_spans(text: str, max_chars: int = 500) -> List[Tuple[int, int]]:
+    """
+    Character spans of speaker turns
+
+    Lines without a speaker label continue the current turn; a transcript with
+    no labels at all is split by line. Turns longer than max_chars are split
+    further at sentence ends.
+    """
+    starts = [m.start() for m in _SPEAKER_LABEL.finditer(text)]
+    if not starts:
+        starts = [0] + [m.end() for m in re.finditer(r"\n", text)]
+    elif starts[0] != 0:
+        starts.insert(0, 0)
+
+    turns = []
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        start, end = _trim(text, start, end)
+        if end <= start:
+            continue
+        if end - start > max_chars:
+            turns.extend(_split_long(text, start, end, max_chars))
+        else:
+            turns.append((start, end))
+    return turns
+
+
+def passage_spans(text: str, max_chars: int = 500, overlap_turns: int = 1) -> List[Tuple[int, int]]:
+    """
+    Overlapping passages of whole turns
+
+    Each passage packs consecutive turns up to about max_chars and the next
+    one starts `overlap_turns` turns before the previous one ended, so a
+    question and its answer stay together in at least one passage.
+
+    Args:
+        text: Transcript
+        max_chars: Passage length budget (a single turn is never split across passages)
+        overlap_turns: Turns repeated at the start of the next passage
+
+    Returns:
+        (start, end) character spans into text
+    """
+    turns = turn_spans(text, max_chars)
+    spans = []
+    i = 0
+    while i < len(turns):
+        j = i + 1
+        while j < len(turns) and turns[j][1] - turns[i][0] <= max_chars:
+            j += 1
+        spans.append((turns[i][0], turns[j - 1][1]))
+        if j == len(turns):
+            break
+        i = max(i + 1, j - overlap_turns)
+    return spans
+
+
+class PassageEmbeddings:
+    """
+    Passage vectors of many conversations in one (passages, dim) matrix
+
+    Conversation i owns rows offsets[i]:offsets[i + 1] (CSR layout), so the
+    passage-to-conversation map costs one integer per conversation and
+    per-conversation scores are segment reductions over a single
+    matrix-vector product. Every conversation has at least one passage.
+    """
+
+    __slots__ = ('vectors', 'offsets')
+
+    def __init__(self, vectors: np.ndarray, offsets: np.ndarray):
+        """
+        Args:
+            vectors: (passages, dim) float32 unit vectors
+            offsets: (conversations + 1,) int64 row offsets, starting at 0
+        """
+        self.vectors = vectors
+        self.offsets = offsets
+
+    @classmethod
+    def stack(cls, matrices: Sequence[np.ndarray], dimension: int) -> "PassageEmbeddings":
+        """Concatenate per-conversation (passages, dim) matrices"""
+        offsets = np.zeros(len(matrices) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(matrix) for matrix in matrices])
+        if not matrices:
+            return cls(np.zeros((0, dimension), dtype=np.float32), offsets)
+        return cls(np.vstack(matrices).astype(np.float32, copy=False), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def conversation(self, i: int) -> np.ndarray:
+        return self.vectors[self.offsets[i]:self.offsets[i + 1]]
+
+    def select(self, rows: Sequence[int]) -> "PassageEmbeddings":
+        """Subset of conversations, in the given order"""
+        return PassageEmbeddings.stack([self.conversation(i) for i in rows], self.vectors.shape[1])
+
+    def pooled(self) -> np.ndarray:
+        """(conversations, dim) normalized mean of each conversation's passages"""
+        if len(self) == 0:
+            return np.zeros((0, self.vectors.shape[1]), dtype=np.float32)
+        sums = np.add.reduceat(self.vectors, self.offsets[:-1], axis=0)
+        return (sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)).astype(np.float32)
+
+    def scores(self, query: np.ndarray, mode: str = 'max', top_n: int = 3) -> np.ndarray:
+        """
+        Conversation scores for a unit query vector
+
+        Args:
+            query: (dim,) unit vector
+            mode: 'max' (best passage) or 'mean' (mean of the top_n passages)
+            top_n: Passages averaged in 'mean' mode
+
+        Returns:
+            (conversations,) cosine scores
+        """
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.float32)
+        similarities = self.vectors @ query
+        starts = self.offsets[:-1]
+        if mode == 'max':
+            return np.maximum.reduceat(similarities, starts)
+
+        counts = np.diff(self.offsets)
+        owner = np.repeat(np.arange(len(self)), counts)
+        # Passages grouped by conversation, best first within each group
+        ranked = similarities[np.lexsort((-similarities, owner))]
+        keep = np.arange(len(ranked)) - np.repeat(starts, counts) < top_n
+        sums = np.bincount(owner[keep], weights=ranked[keep], minlength=len(self))
+        return (sums / np.minimum(counts, top_n)).astype(np.float32)
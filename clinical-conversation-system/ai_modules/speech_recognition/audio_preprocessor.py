@@ -0,0 +1,76 @@
+import os
+from typing import Optional
+import numpy as np
+import whisper
+from loguru import logger
+
+# Suffix of the decoded 16 kHz mono float32 copy stored next to each upload
+PCM_SUFFIX = ".16k.npy"
+
+
+def preprocessed_path(audio_file_path: str) -> str:
+    """Location of the decoded PCM array for an uploaded audio file."""
+    return audio_file_path + PCM_SUFFIX
+
+
+def has_preprocessed_audio(audio_file_path: str) -> bool:
+    """True if a decoded array exists and is not older than the source file."""
+    pcm_path = preprocessed_path(audio_file_path)
+    if not os.path.exists(pcm_path):
+        return False
+    if not os.path.exists(audio_file_path):
+        return True
+    return os.path.getmtime(pcm_path) >= os.path.getmtime(audio_file_path)
+
+
+def preprocess_audio(audio_file_path: str) -> Optional[str]:
+    """
+    Decode an audio file once into 16 kHz mono float32 PCM and store it as .npy
+
+    Meant to run as a background task right after upload. Failures are logged
+    and swallowed: transcription falls back to decoding the original file.
+
+    Args:
+        audio_file_path: Path to the uploaded audio file
+
+    Returns:
+        Path of the stored array, or None if decoding failed
+    """
+    pcm_path = preprocessed_path(audio_file_path)
+    tmp_path = pcm_path + ".tmp"
+    try:
+        audio = whisper.load_audio(audio_file_path)
+        with open(tmp_path, "wb") as f:
+            np.save(f, audio)
+        # Atomic swap so readers never see a half-written array
+        os.replace(tmp_path, pcm_path)
+        logger.info(f"🎚️ Preprocessed {audio_file_path} ({len(audio) / whisper.audio.SAMPLE_RATE:.1f}s)")
+        return pcm_path
+    except Exception as e:
+        logger.error(f"❌ Audio preprocessing failed for {audio_file_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+
+def load_audio(audio_file_path: str, persist: bool = False) -> np.ndarray:
+    """
+    Return 16 kHz mono float32 audio, memory-mapping the preprocessed copy if present
+
+    The array is opened copy-on-write, so Whisper can wrap it without copying
+    and without touching the file on disk.
+
+    Args:
+        audio_file_path: Path to the original audio file
+        persist: Store the decoded array when no preprocessed copy exists yet
+
+    Returns:
+        Waveform as a numpy array
+    """
+    if not has_preprocessed_audio(audio_file_path) and persist:
+        preprocess_audio(audio_file_path)
+
+    if has_preprocessed_audio(audio_file_path):
+        return np.load(preprocessed_path(audio_file_path), mmap_mode="c")
+
+    return whisper.load_audio(audio_file_path)
@@ -0,0 +1,135 @@
+import numpy as np
+from typing import Dict, List
+from loguru import logger
+
+from ai_modules.speech_recognition.transcriber import SpeechRecognizer, SpeakerTurnTracker
+from ai_modules.speech_recognition.vad import SAMPLE_RATE
+
+
+class StreamingTranscriber:
+    """
+    Rolling-window Whisper transcription for audio that arrives while the
+    consultation is still going on
+
+    Audio is buffered from the last committed segment onwards. Every
+    `step_s` seconds of new audio the buffer is re-decoded: segments that
+    end well before the buffer edge become final (speaker-labelled and
+    dropped from the buffer), the rest are reported as partial and
+    re-decoded on the next step.
+    """
+
+    def __init__(
+            self,
+            recognizer: SpeechRecognizer,
+            step_s: float = 3.0,
+            holdback_s: float = 1.5,
+            max_window_s: float = 30.0
+    ):
+        """
+        Initialize streaming transcriber
+
+        Args:
+            recognizer: Loaded SpeechRecognizer whose Whisper model is reused
+            step_s: Seconds of new audio between decodes
+            holdback_s: Segments ending closer than this to the buffer edge stay partial
+            max_window_s: Buffer length at which everything older than holdback_s is
+                forced final (or dropped, when Whisper found no speech in it)
+        """
+        self.recognizer = recognizer
+        self.step_samples = int(step_s * SAMPLE_RATE)
+        self.holdback_s = holdback_s
+        self.max_window_s = max_window_s
+
+        self.tracker = SpeakerTurnTracker()
+        self.lines: List[str] = []
+        self.language = "en"
+
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._offset_s = 0.0  # Global time of the first buffered sample
+        self._undecoded = 0  # Samples received since the last decode
+
+    @property
+    def transcription(self) -> str:
+        """Speaker-labelled transcript of all finalized segments."""
+        return "\n".join(self.lines)
+
+    def add_audio(self, pcm: bytes) -> List[Dict]:
+        """
+        Append a frame of 16 kHz mono 16-bit little-endian PCM
+
+        Args:
+            pcm: Raw audio bytes
+
+        Returns:
+            Final and partial segment events produced by this frame (often empty)
+        """
+        samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+        self._buffer = np.concatenate((self._buffer, samples))
+        self._undecoded += len(samples)
+
+        if self._undecoded < self.step_samples:
+            return []
+        return self._decode(final=False)
+
+    def finish(self) -> List[Dict]:
+        """Decode whatever is left in the buffer and mark every segment final."""
+        if len(self._buffer) == 0:
+            return []
+        return self._decode(final=True)
+
+    def _decode(self, final: bool) -> List[Dict]:
+        self._undecoded = 0
+        result = self.recognizer.transcribe_array(self._buffer, condition_on_previous_text=False)
+        self.language = result.get("language", self.language)
+
+        segments = [seg for seg in result.get("segments", []) if seg['text'].strip()]
+        buffer_s = len(self._buffer) / SAMPLE_RATE
+
+        forced = not final and buffer_s >= self.max_window_s
+        if final:
+            n_final = len(segments)
+        else:
+            # The newest segment may still be cut mid-sentence
+            n_final = sum(1 for seg in segments[:-1] if seg['end'] <= buffer_s - self.holdback_s)
+            if forced:
+                # A lone segment is committed too, otherwise the window never shrinks
+                n_final = max(n_final, len(segments) - 1, min(1, len(segments)))
+
+        events = []
+        for seg in segments[:n_final]:
+            text = seg['text'].strip()
+            speaker = self.tracker.label(text)
+            self.lines.append(f"{speaker}: {text}")
+            events.append(self._event("final", speaker, seg))
+
+        for seg in segments[n_final:]:
+            # Partials show the expected speaker without advancing the state machine
+            events.append(self._event("partial", self.tracker.current_speaker, seg))
+
+        if final:
+            self._offset_s += buffer_s
+            self._buffer = np.zeros(0, dtype=np.float32)
+        else:
+            cut_s = segments[n_final - 1]['end'] if n_final else 0.0
+            if forced:
+                # Audio Whisper found no speech in (silence, noise) is dropped up to
+                # the next pending segment, or up to the holdback when none is left
+                pending = segments[n_final:]
+                cut_s = max(cut_s, pending[0]['start'] if pending else buffer_s - self.holdback_s)
+            cut = min(len(self._buffer), int(cut_s * SAMPLE_RATE))
+            if cut > 0:
+                self._offset_s += cut / SAMPLE_RATE
+                self._buffer = self._buffer[cut:]
+
+        if n_final or forced:
+            logger.debug(f"Streaming: {n_final} final segment(s), {len(self._buffer) / SAMPLE_RATE:.1f}s buffered")
+        return events
+
+    def _event(self, kind: str, speaker: str, seg: Dict) -> Dict:
+        return {
+            'type': kind,
+            'speaker': speaker,
+            'text': seg['text'].strip(),
+            'start': round(self._offset_s + seg['start'], 2),
+            'end': round(self._offset_s + seg['end'], 2)
+        }
@@ -1,11 +1,85 @@
 import os
+import threading
+import multiprocessing
+from collections import Counter
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import torch
 import whisper
 from loguru import logger
 
+from ai_modules.speech_recognition.audio_preprocessor import load_audio
+from ai_modules.speech_recognition.transcription_cache import TranscriptionCache
+from ai_modules.speech_recognition.vad import SAMPLE_RATE, split_on_silence
+
+# Whisper decoding options shared by the single-process and chunked paths
+# fp16=False for stability on laptops
+DECODE_OPTIONS = {'fp16': False}
+
+# Per-process model used by the chunked transcription pool
+_worker_model = None
+
+
+def _init_worker(model_name: str, num_threads: int):
+    """Load one Whisper model per pool process and pin its thread count."""
+    global _worker_model
+    torch.set_num_threads(num_threads)
+    _worker_model = whisper.load_model(model_name)
+
+
+def _transcribe_chunk(task: tuple) -> tuple:
+    """Transcribe a single audio chunk inside a pool process."""
+    index, audio, options = task
+    return index, _worker_model.transcribe(audio, **options)
+
+
+class SpeakerTurnTracker:
+    """
+    Incremental Doctor/Patient switching heuristic
+
+    Consumes transcript segments one at a time, so the same logic serves
+    batch diarization and live streaming.
+    """
+
+    def __init__(self, first_speaker: str = "Doctor"):
+        self.current_speaker = first_speaker  # First person to talk is Doctor
+
+    def label(self, text: str) -> Optional[str]:
+        """Return the speaker of a segment and advance the state, or None for empty text."""
+        text = text.strip()
+        if not text:
+            return None
+
+        speaker = self.current_speaker
+
+        # If Doctor asks a question (?), switch to Patient.
+        # If Patient ends a statement (.), switch back to Doctor.
+        if "?" in text and speaker == "Doctor":
+            self.current_speaker = "Patient"
+        elif text.endswith((".", "!")) and speaker == "Patient":
+            self.current_speaker = "Doctor"
+
+        return speaker
+
 
 class SpeechRecognizer:
-    def __init__(self, model_name: str = "base"):
+    def __init__(self, model_name: str = "base", parallel_workers: int = 0,
+                 cache: Optional[TranscriptionCache] = None):
+        """
+        Args:
+            model_name: Whisper model size
+            parallel_workers: Number of processes used to transcribe silence-split
+                chunks in parallel. 0 or 1 keeps the single-process path.
+            cache: Optional result cache consulted before running Whisper
+        """
         logger.info(f"🎙️ Loading Whisper model: {model_name}")
+        self.model_name = model_name
+        self.parallel_workers = parallel_workers
+        self.cache = cache
+        self._pool = None
+        # Whisper installs decoding hooks on the shared model, so calls must not overlap
+        self._model_lock = threading.Lock()
         try:
             self.model = whisper.load_model(model_name)
             logger.info("✅ Whisper model loaded successfully")
@@ -19,18 +93,103 @@ class SpeechRecognizer:
             if not os.path.exists(audio_file_path):
                 raise FileNotFoundError(f"File not found: {audio_file_path}")
 
-            # fp16=False for stability on laptops
-            result = self.model.transcribe(audio_file_path, fp16=False)
-            return {
+            cache_key = None
+            if self.cache is not None:
+                # Chunked decoding can segment differently, so it is part of the key
+                options = {**DECODE_OPTIONS, 'chunked': self.parallel_workers > 1}
+                cache_key = self.cache.make_key(audio_file_path, self.model_name, options)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"⚡ Transcription cache hit ({self.cache.stats()})")
+                    return cached
+
+            # Uses the upload-time PCM copy when available, skipping ffmpeg
+            audio = load_audio(audio_file_path)
+
+            if self.parallel_workers > 1:
+                result = self._transcribe_chunked(audio)
+            else:
+                result = self.transcribe_array(audio)
+
+            output = {
                 'success': True,
                 'text': result.get("text", "").strip(),
                 'segments': result.get("segments", []),
                 'language': result.get("language", "en")
             }
+            if cache_key is not None:
+                self.cache.put(cache_key, output)
+            return output
         except Exception as e:
             logger.error(f"Transcription Error: {e}")
             return {'success': False, 'error': str(e)}
 
+    def transcribe_array(self, audio: np.ndarray, **options) -> dict:
+        """Run Whisper on an in-memory 16 kHz waveform and return its raw result."""
+        with self._model_lock:
+            return self.model.transcribe(audio, **{**DECODE_OPTIONS, **options})
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Start the worker pool on first use; each worker keeps its model loaded."""
+        if self._pool is None:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // self.parallel_workers)
+            logger.info(f"🧵 Starting {self.parallel_workers} Whisper workers "
+                        f"({threads_per_worker} threads each)")
+            # spawn avoids forking a process that already holds torch thread pools
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.parallel_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_name, threads_per_worker)
+            )
+        return self._pool
+
+    def _transcribe_chunked(self, audio: np.ndarray) -> dict:
+        """
+        Split the audio on silence, decode the chunks across the worker pool
+        and stitch the segments back together on the global timeline.
+        """
+        chunks = split_on_silence(audio, SAMPLE_RATE)
+
+        # Short clips are not worth the inter-process round trip
+        if len(chunks) <= 1:
+            return self.transcribe_array(audio)
+
+        logger.info(f"✂️ Split {len(audio) / SAMPLE_RATE:.0f}s of audio into {len(chunks)} chunks")
+        tasks = [(i, audio[start:end], DECODE_OPTIONS) for i, (start, end) in enumerate(chunks)]
+        results = dict(self._get_pool().map(_transcribe_chunk, tasks))
+
+        segments = []
+        texts = []
+        languages = Counter()
+        for i, (start, _) in enumerate(chunks):
+            chunk_result = results[i]
+            offset = start / SAMPLE_RATE
+            for seg in chunk_result.get("segments", []):
+                seg = dict(seg)
+                seg['id'] = len(segments)
+                seg['seek'] = seg.get('seek', 0) + start * 100 // SAMPLE_RATE
+                seg['start'] = round(seg['start'] + offset, 3)
+                seg['end'] = round(seg['end'] + offset, 3)
+                segments.append(seg)
+
+            text = chunk_result.get("text", "").strip()
+            if text:
+                texts.append(text)
+            languages[chunk_result.get("language", "en")] += 1
+
+        return {
+            'text': " ".join(texts),
+            'segments': segments,
+            'language': languages.most_common(1)[0][0] if languages else "en"
+        }
+
+    def close(self):
+        """Shut down the chunked transcription pool, if it was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
     def transcribe_with_speaker_diarization(self, audio_file_path: str) -> dict:
         """
         🔧 FIXED: This method must exist to stop the AttributeError.
@@ -41,21 +200,12 @@ class SpeechRecognizer:
             return result
 
         labeled_lines = []
-        current_speaker = "Doctor"  # Initial assumption
+        tracker = SpeakerTurnTracker()
 
         for seg in result['segments']:
-            text = seg['text'].strip()
-            if not text: continue
-
-            # Logic: First person to talk is Doctor.
-            # If Doctor asks a question (?), switch to Patient.
-            # If Patient ends a statement (.), switch back to Doctor.
-            labeled_lines.append(f"{current_speaker}: {text}")
-
-            if "?" in text and current_speaker == "Doctor":
-                current_speaker = "Patient"
-            elif text.endswith((".", "!")) and current_speaker == "Patient":
-                current_speaker = "Doctor"
+            speaker = tracker.label(seg['text'])
+            if speaker:
+                labeled_lines.append(f"{speaker}: {seg['text'].strip()}")
 
         # Update the result with the properly labeled transcript
         return {
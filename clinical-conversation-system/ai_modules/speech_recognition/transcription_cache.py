@@ -0,0 +1,123 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from loguru import logger
+
+
+class TranscriptionCache:
+    """
+    Content-addressed cache of Whisper results
+
+    Entries are keyed on the SHA-256 of the audio bytes, the Whisper model
+    name and the decode options, so re-uploads of the same recording hit the
+    cache regardless of file name. A small in-memory LRU sits in front of
+    an optional on-disk JSON store.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = 128):
+        """
+        Initialize transcription cache
+
+        Args:
+            cache_dir: Directory for the on-disk tier (None keeps the cache in memory only)
+            max_entries: Number of results kept in the in-memory LRU tier
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def hash_audio(audio_file_path: str, block_size: int = 1 << 20) -> str:
+        """SHA-256 of the audio file contents, read in blocks."""
+        digest = hashlib.sha256()
+        with open(audio_file_path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def make_key(self, audio_file_path: str, model_name: str, options: Dict) -> str:
+        """
+        Build the cache key for an audio file
+
+        Args:
+            audio_file_path: Path to the audio file
+            model_name: Whisper model name
+            options: Decode options that influence the result
+
+        Returns:
+            Hex digest identifying (audio content, model, options)
+        """
+        payload = json.dumps({
+            'audio': self.hash_audio(audio_file_path),
+            'model': model_name,
+            'options': options
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _remember(self, key: str, result: Dict):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached result for a key, or None on a miss."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+        if self.cache_dir and os.path.exists(self._disk_path(key)):
+            try:
+                with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                    result = json.load(f)
+                with self._lock:
+                    self._remember(key, result)
+                    self.disk_hits += 1
+                return result
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable transcription cache entry {key}: {e}")
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, result: Dict):
+        """Store a successful transcription result."""
+        with self._lock:
+            self._remember(key, result)
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory)
+            }
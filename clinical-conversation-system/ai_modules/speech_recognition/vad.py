@@ -0,0 +1,127 @@
+import numpy as np
+from typing import List, Tuple
+
+# Whisper works on 16 kHz mono audio (whisper.audio.SAMPLE_RATE)
+SAMPLE_RATE = 16000
+
+
+def frame_energies(audio: np.ndarray, sample_rate: int = SAMPLE_RATE, frame_ms: int = 30) -> np.ndarray:
+    """
+    Compute the RMS energy (in dBFS) of consecutive non-overlapping frames
+
+    Args:
+        audio: Mono float32 waveform in [-1, 1]
+        sample_rate: Sampling rate of the waveform
+        frame_ms: Frame length in milliseconds
+
+    Returns:
+        Array with one energy value per frame
+    """
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = len(audio) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    frames = np.asarray(audio[:n_frames * frame_len], dtype=np.float32).reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    return 20.0 * np.log10(rms + 1e-10)
+
+
+def find_silences(
+        audio: np.ndarray,
+        sample_rate: int = SAMPLE_RATE,
+        frame_ms: int = 30,
+        min_silence_ms: int = 300,
+        margin_db: float = 10.0
+) -> List[Tuple[int, int]]:
+    """
+    Locate silent stretches using an adaptive energy threshold
+
+    The threshold sits `margin_db` above the noise floor (10th percentile
+    of frame energies), so it adapts to the recording level of each room.
+
+    Args:
+        audio: Mono float32 waveform
+        sample_rate: Sampling rate of the waveform
+        frame_ms: Frame length in milliseconds
+        min_silence_ms: Shortest pause that counts as silence
+        margin_db: Distance above the noise floor still treated as silence
+
+    Returns:
+        List of (start_sample, end_sample) ranges that are silent
+    """
+    energies = frame_energies(audio, sample_rate, frame_ms)
+    if len(energies) == 0:
+        return []
+
+    threshold = np.percentile(energies, 10) + margin_db
+    silent = energies < threshold
+
+    # Run-length encode the silent frames
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+
+    frame_len = int(sample_rate * frame_ms / 1000)
+    min_frames = max(1, min_silence_ms // frame_ms)
+
+    return [
+        (int(start * frame_len), int(end * frame_len))
+        for start, end in zip(run_starts, run_ends)
+        if end - start >= min_frames
+    ]
+
+
+def split_on_silence(
+        audio: np.ndarray,
+        sample_rate: int = SAMPLE_RATE,
+        min_chunk_s: float = 10.0,
+        max_chunk_s: float = 29.5,
+        min_silence_ms: int = 300
+) -> List[Tuple[int, int]]:
+    """
+    Split a recording into contiguous chunks that end in pauses
+
+    Each chunk is cut at the longest pause between `min_chunk_s` and
+    `max_chunk_s` after its start. The default maximum keeps every chunk
+    inside a single 30 s Whisper window. If no pause exists in that range
+    the chunk is cut hard at `max_chunk_s`.
+
+    Args:
+        audio: Mono float32 waveform
+        sample_rate: Sampling rate of the waveform
+        min_chunk_s: Shortest chunk length in seconds
+        max_chunk_s: Longest chunk length in seconds
+        min_silence_ms: Shortest pause that is considered a cut point
+
+    Returns:
+        List of (start_sample, end_sample) ranges covering the whole audio
+    """
+    total = len(audio)
+    max_len = int(max_chunk_s * sample_rate)
+    min_len = int(min_chunk_s * sample_rate)
+
+    if total <= max_len:
+        return [(0, total)] if total else []
+
+    # Cut in the middle of each pause, weighted by how long the pause is
+    silences = find_silences(audio, sample_rate, min_silence_ms=min_silence_ms)
+    cut_points = np.array([(s + e) // 2 for s, e in silences], dtype=np.int64)
+    cut_weights = np.array([e - s for s, e in silences], dtype=np.int64)
+
+    chunks = []
+    start = 0
+    while total - start > max_len:
+        lo = np.searchsorted(cut_points, start + min_len, side="left")
+        hi = np.searchsorted(cut_points, start + max_len, side="right")
+
+        if hi > lo:
+            cut = int(cut_points[lo + int(np.argmax(cut_weights[lo:hi]))])
+        else:
+            cut = start + max_len
+
+        chunks.append((start, cut))
+        start = cut
+
+    chunks.append((start, total))
+    return chunks
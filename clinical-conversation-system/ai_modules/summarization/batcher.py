@@ -0,0 +1,148 @@
+import math
+import time
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Tuple
+from loguru import logger
+
+from ai_modules.summarization.summarizer import Summarizer, DEFAULT_PROFILE, GENERATION_ERROR
+
+
+class SummaryBatcher:
+    """
+    Dynamic micro-batching in front of Summarizer.generate
+
+    Requests are queued and a single worker thread drains the queue: it
+    waits at most `max_wait_ms` after the first request for more to
+    arrive, up to `max_batch_size`, then runs them through one padded
+    generate() call per decoding profile and resolves each caller's future.
+    Transcripts beyond the encoder limit go to a separate worker, so their
+    map-reduce never holds up the short requests queued behind them.
+    """
+
+    def __init__(self, summarizer: Summarizer, max_batch_size: int = 8, max_wait_ms: float = 20.0,
+                 long_workers: int = 1):
+        """
+        Initialize batcher
+
+        Args:
+            summarizer: Loaded Summarizer instance
+            max_batch_size: Largest number of transcripts per generate() call
+            max_wait_ms: Longest time the first request waits for company
+            long_workers: Threads running map-reduce for over-long transcripts
+        """
+        self.summarizer = summarizer
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._busy = False
+        self._batch_ema_s = 0.0
+        self._long_pool = ThreadPoolExecutor(max_workers=max(1, long_workers), thread_name_prefix="summary-long")
+        self._worker = threading.Thread(target=self._run, name="summary-batcher", daemon=True)
+        self._worker.start()
+        logger.info(f"📦 Summary batcher ready (max_batch_size={self.max_batch_size}, "
+                    f"max_wait_ms={max_wait_ms})")
+
+    def submit(self, text: str, profile: str = DEFAULT_PROFILE) -> Future:
+        """Queue a transcript; the returned future resolves to its summary."""
+        if self._closed:
+            raise RuntimeError("SummaryBatcher is closed")
+        future = Future()
+        self._queue.put((text, profile, future))
+        return future
+
+    def summarize(self, text: str, profile: str = DEFAULT_PROFILE) -> str:
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(text, profile).result()
+
+    def pending(self) -> int:
+        """Approximate number of requests waiting for a batch slot."""
+        return self._queue.qsize()
+
+    def estimated_wait_ms(self) -> float:
+        """Expected queueing delay for a new request, from recent batch durations."""
+        batches_ahead = math.ceil(self.pending() / self.max_batch_size) + (1 if self._busy else 0)
+        return batches_ahead * self._batch_ema_s * 1000 + self.max_wait_s * 1000
+
+    def close(self):
+        """Stop accepting work; queued requests are still served."""
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+        self._long_pool.shutdown()
+
+    def _collect(self, first: Tuple) -> Tuple[List[Tuple], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_s
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch, stop = self._collect(first)
+            # Skip requests whose caller already gave up
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            groups = OrderedDict()
+            for text, profile, future in batch:
+                if self._is_long(text):
+                    self._long_pool.submit(self._summarize_long, text, profile, future)
+                else:
+                    groups.setdefault(profile, []).append((text, future))
+            if not groups:
+                continue
+
+            self._busy = True
+            started = time.perf_counter()
+            for profile, items in groups.items():
+                try:
+                    summaries = self.summarizer.generate_batch([text for text, _ in items], profile)
+                except Exception as e:
+                    for _, future in items:
+                        future.set_exception(e)
+                    continue
+
+                for (_, future), summary in zip(items, summaries):
+                    future.set_result(summary)
+
+            elapsed = time.perf_counter() - started
+            self._batch_ema_s = elapsed if not self._batch_ema_s else 0.8 * self._batch_ema_s + 0.2 * elapsed
+            self._busy = False
+            logger.debug(f"Summarized batch of {sum(len(items) for items in groups.values())} in {elapsed:.2f}s")
+
+    def _is_long(self, text: str) -> bool:
+        try:
+            return self.summarizer.is_long(text)
+        except Exception:
+            # Let generate_batch report the failure for this row
+            return False
+
+    def _summarize_long(self, text: str, profile: str, future: Future):
+        try:
+            future.set_result(self.summarizer.generate_long(text, profile))
+        except Exception as e:
+            logger.error(f"Inference Error: {e}")
+            future.set_result(GENERATION_ERROR)
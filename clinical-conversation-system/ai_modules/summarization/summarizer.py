@@ -1,24 +1,140 @@
 import torch
 import re
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+import json
+import hashlib
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Generator, List, Optional
+from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, TextIteratorStreamer
+from transformers.modeling_outputs import BaseModelOutput
 from loguru import logger
 
+from ai_modules.model_backends import DEFAULT_BACKEND, resolve_backend, quantize_int8
+
+# Named decoding profiles, cheapest first
+DECODING_PROFILES = OrderedDict([
+    ('fast', {
+        'max_new_tokens': 120,
+        'min_new_tokens': 30,
+        'num_beams': 1,
+        'repetition_penalty': 1.2,
+        'no_repeat_ngram_size': 3
+    }),
+    ('balanced', {
+        'max_new_tokens': 150,
+        'min_new_tokens': 40,
+        'num_beams': 2,
+        'repetition_penalty': 1.2,
+        'no_repeat_ngram_size': 3,
+        'early_stopping': True
+    }),
+    ('quality', {
+        'max_new_tokens': 150,
+        'min_new_tokens': 40,
+        'num_beams': 4,
+        'repetition_penalty': 1.2,
+        'no_repeat_ngram_size': 3,
+        'early_stopping': True
+    }),
+])
+DEFAULT_PROFILE = 'quality'
+# Default when a draft model is loaded: assisted decoding needs greedy search
+ASSISTED_PROFILE = 'fast'
+
+# Starting latency guesses (ms per transcript on CPU) until real measurements exist
+PROFILE_PRIOR_MS = {'fast': 1500.0, 'balanced': 3500.0, 'quality': 6000.0}
+
+# Beam search settings used when no profile is requested
+GENERATION_KWARGS = DECODING_PROFILES[DEFAULT_PROFILE]
+
+# Token streamers only work with greedy search
+STREAM_GENERATION_KWARGS = {**GENERATION_KWARGS, 'num_beams': 1, 'early_stopping': False}
+
+INSUFFICIENT_DATA = "Insufficient data for summary."
+GENERATION_ERROR = "Error generating clinical summary."
+
+# Decoder prompts for single-pass SOAP generation, keyed by ClinicalSummary column
+SOAP_PROMPTS = OrderedDict([
+    ('full_summary', ''),
+    ('subjective', 'Subjective:'),
+    ('objective', 'Objective:'),
+    ('assessment', 'Assessment:'),
+    ('plan', 'Plan:'),
+])
+
+# BART's encoder limit; longer transcripts go through map-reduce summarization
+MAX_INPUT_TOKENS = 1024
+# Chunk size for the map step, leaving room for the task prefix and special tokens
+CHUNK_TOKENS = 900
+# Chunks summarized per generate() call in the map step
+CHUNK_BATCH_SIZE = 8
+
 
 class Summarizer:
-    def __init__(self, model_name: str = "facebook/bart-large-cnn"):
+    def __init__(self, model_name: str = "facebook/bart-large-cnn", chunk_cache_size: int = 1024,
+                 draft_model_name: Optional[str] = None, backend: str = DEFAULT_BACKEND):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"🚀 Initializing {model_name} on {self.device}...")
+        self.model_name = model_name
+        self.backend = resolve_backend(backend, self.device)
+        # Map-step summaries keyed by chunk hash, so small edits only recompute changed chunks
+        self.chunk_cache_size = chunk_cache_size
+        self._chunk_cache = OrderedDict()
+        self._chunk_cache_lock = threading.Lock()
+        # Moving average of observed generate() latency per decoding profile
+        self.latency_ema_ms = dict(PROFILE_PRIOR_MS)
+        self.latency_alpha = 0.2
+        self._latency_lock = threading.Lock()
+        logger.info(f"🚀 Initializing {model_name} ({self.backend}) on {self.device}...")
         try:
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name).to(self.device)
+            self.model = self._load_model(model_name)
             logger.info("✅ Summarizer ready!")
         except Exception as e:
             logger.error(f"❌ Load Error: {e}")
             raise
 
-    def clean_output(self, text: str) -> str:
+        # Optional small seq2seq model for assisted (speculative) greedy decoding.
+        # It must share the main model's tokenizer, e.g. a distilled BART-CNN.
+        self.draft_model = None
+        # Profile used when the caller asks for neither a profile nor a latency budget
+        self.default_profile = DEFAULT_PROFILE
+        if draft_model_name and self.backend == 'onnx':
+            logger.warning("⚠️ Assisted decoding needs a PyTorch main model, ignoring draft model on onnx backend")
+        elif draft_model_name:
+            try:
+                self.draft_model = self._load_model(draft_model_name)
+                # Beam profiles cannot use the draft model, so the default switches to greedy
+                self.default_profile = ASSISTED_PROFILE
+                logger.info(f"✅ Draft model {draft_model_name} ready for assisted decoding; it applies to the "
+                            f"'{ASSISTED_PROFILE}' profile (now the default) and streamed summaries, "
+                            f"beam-search profiles decode without it")
+            except Exception as e:
+                logger.warning(f"⚠️ Draft model {draft_model_name} unavailable, using plain decoding: {e}")
+
+    def _load_model(self, model_name: str):
+        """Load a seq2seq model for the configured backend."""
+        if self.backend == 'onnx':
+            # Optional dependency: pip install optimum[onnxruntime]
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            return ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name).to(self.device)
+        if self.backend == 'int8':
+            model = quantize_int8(model)
+        return model.eval()
+
+    @property
+    def cache_name(self) -> str:
+        """Model identity for summary caches; non-fp32 backends produce slightly different text."""
+        if self.backend == DEFAULT_BACKEND:
+            return self.model_name
+        return f"{self.model_name}:{self.backend}"
+
+    def clean_output(self, text: str, final: bool = True) -> str:
         """
         Scrub out 'Doctor:', 'Patient:', and weird artifacts like 'ipient'.
+        final=False skips the closing period, for partial streamed text.
         """
         # 1. Remove Speaker Labels
         text = re.sub(r'(Doctor|Patient|ipient|Recipient|Speaker \d+):', '', text, flags=re.IGNORECASE)
@@ -33,41 +149,410 @@ class Summarizer:
         # 4. Ensure it starts with a capital and ends with a period
         if text:
             text = text[0].upper() + text[1:]
-            if not text.endswith('.'):
+            if final and not text.endswith('.'):
                 text += "."
 
         return text
 
-    def generate(self, text: str) -> str:
+    def select_profile(self, latency_budget_ms: Optional[float], queue_delay_ms: float = 0.0) -> str:
+        """
+        Pick the best decoding profile expected to finish within the latency budget.
+        Falls back to the cheapest profile when nothing fits, so load degrades quality
+        instead of growing the queue.
+        """
+        if latency_budget_ms is None:
+            return self.default_profile
+
+        with self._latency_lock:
+            estimates = dict(self.latency_ema_ms)
+
+        for name in reversed(DECODING_PROFILES):
+            if estimates[name] + queue_delay_ms <= latency_budget_ms:
+                return name
+        return next(iter(DECODING_PROFILES))
+
+    def _record_latency(self, profile: str, elapsed_ms: float, rows: int = 1):
+        """Fold one padded generate() call over `rows` transcripts into the profile's per-transcript estimate"""
+        elapsed_ms /= max(1, rows)
+        with self._latency_lock:
+            previous = self.latency_ema_ms[profile]
+            self.latency_ema_ms[profile] = (1 - self.latency_alpha) * previous + self.latency_alpha * elapsed_ms
+
+    def generate(self, text: str, profile: str = DEFAULT_PROFILE) -> str:
+        return self.generate_batch([text], profile)[0]
+
+    def generate_batch(self, texts: List[str], profile: str = DEFAULT_PROFILE) -> List[str]:
+        """
+        Summarize several transcripts with a single padded generate() call
+        using the given decoding profile. Results come back in input order.
+        If the padded call fails, the rows are retried one at a time so a
+        single bad transcript only fails itself.
+        """
+        summaries = [
+            INSUFFICIENT_DATA if not text or len(text.strip()) < 30 else None
+            for text in texts
+        ]
+        pending = [i for i, summary in enumerate(summaries) if summary is None]
+        if not pending:
+            return summaries
+
         try:
-            if not text or len(text.strip()) < 30:
-                return "Insufficient data for summary."
+            long_docs = [i for i in pending if self.is_long(texts[i])]
+        except Exception as e:
+            logger.error(f"Inference Error: {e}")
+            return [GENERATION_ERROR if summary is None else summary for summary in summaries]
+        short_docs = [i for i in pending if i not in long_docs]
+
+        if short_docs:
+            try:
+                started = time.perf_counter()
+                raw_summaries = self._generate_raw([texts[i] for i in short_docs], profile)
+                # Normalised by batch size, since select_profile compares against one request's
+                # budget; map-reduce runs below are left out, they say nothing about typical visits
+                self._record_latency(profile, (time.perf_counter() - started) * 1000, len(short_docs))
+                # Apply the cleaning layer
+                for i, raw_summary in zip(short_docs, raw_summaries):
+                    summaries[i] = self.clean_output(raw_summary)
+            except Exception as e:
+                logger.error(f"Inference Error: {e}")
+                if len(short_docs) > 1:
+                    logger.warning(f"⚠️ Retrying {len(short_docs)} transcripts one at a time")
+                for i in short_docs:
+                    summaries[i] = self._generate_single(texts[i], profile)
+
+        for i in long_docs:
+            try:
+                summaries[i] = self.generate_long(texts[i], profile)
+            except Exception as e:
+                logger.error(f"Inference Error: {e}")
+                summaries[i] = GENERATION_ERROR
+
+        return summaries
+
+    def _generate_single(self, text: str, profile: str) -> str:
+        """One unbatched transcript, GENERATION_ERROR if it fails on its own too."""
+        try:
+            return self.clean_output(self._generate_raw([text], profile)[0])
+        except Exception as e:
+            logger.error(f"Inference Error: {e}")
+            return GENERATION_ERROR
+
+    def is_long(self, text: str) -> bool:
+        """Transcript exceeds the encoder limit and needs map-reduce summarization."""
+        return self.count_tokens(text) > MAX_INPUT_TOKENS
+
+    def _generate_raw(self, texts: List[str], profile: str = DEFAULT_PROFILE) -> List[str]:
+        """Run one padded generate() call and return the decoded, uncleaned outputs."""
+        # Use the 'summarize' task prefix BART was trained on
+        input_texts = ["summarize: " + text for text in texts]
+
+        inputs = self.tokenizer(
+            input_texts,
+            return_tensors="pt",
+            truncation=True,
+            padding=True,
+            max_length=MAX_INPUT_TOKENS
+        ).to(self.device)
+
+        generation_kwargs = DECODING_PROFILES[profile]
+
+        # Assisted decoding verifies draft tokens with greedy search, one sequence at a time
+        if self.draft_model is not None and generation_kwargs.get('num_beams', 1) == 1:
+            raw_summaries = []
+            for row in range(inputs.input_ids.shape[0]):
+                length = int(inputs.attention_mask[row].sum())
+                output_ids = self.model.generate(
+                    input_ids=inputs.input_ids[row:row + 1, :length],
+                    attention_mask=inputs.attention_mask[row:row + 1, :length],
+                    assistant_model=self.draft_model,
+                    **generation_kwargs
+                )
+                raw_summaries.append(self.tokenizer.decode(output_ids[0], skip_special_tokens=True))
+            return raw_summaries
+
+        output_ids = self.model.generate(
+            input_ids=inputs.input_ids,
+            attention_mask=inputs.attention_mask,
+            **generation_kwargs
+        )
+
+        return self.tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+
+    def count_tokens(self, text: str) -> int:
+        """Encoder length of a transcript including the task prefix."""
+        return len(self.tokenizer("summarize: " + text, truncation=False).input_ids)
+
+    def split_into_chunks(self, text: str, max_tokens: int = CHUNK_TOKENS) -> List[str]:
+        """
+        Pack consecutive speaker turns into chunks of at most `max_tokens` tokens.
+        A single turn longer than the limit is split on token boundaries.
+        """
+        turns = [line.strip() for line in text.split("\n") if line.strip()]
+        turn_ids = self.tokenizer(turns, add_special_tokens=False).input_ids if turns else []
+
+        pieces = []
+        for turn, ids in zip(turns, turn_ids):
+            if len(ids) <= max_tokens:
+                pieces.append((turn, len(ids)))
+                continue
+            for start in range(0, len(ids), max_tokens):
+                piece_ids = ids[start:start + max_tokens]
+                pieces.append((self.tokenizer.decode(piece_ids, skip_special_tokens=True), len(piece_ids)))
+
+        chunks = []
+        current, current_len = [], 0
+        for piece, length in pieces:
+            # +1 approximates the newline joining two turns
+            if current and current_len + length + 1 > max_tokens:
+                chunks.append("\n".join(current))
+                current, current_len = [], 0
+            current.append(piece)
+            current_len += length + 1
+
+        if current:
+            chunks.append("\n".join(current))
+        return chunks
 
-            # Use the 'summarize' task prefix BART was trained on
-            input_text = "summarize: " + text
+    def _chunk_key(self, chunk: str, profile: str) -> str:
+        payload = json.dumps({'model': self.cache_name, 'generation': DECODING_PROFILES[profile], 'chunk': chunk},
+                             sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
+    def _summarize_chunks(self, chunks: List[str], profile: str) -> List[str]:
+        """Map step: summarize chunks in batches, reusing cached chunk summaries."""
+        keys = [self._chunk_key(chunk, profile) for chunk in chunks]
+
+        with self._chunk_cache_lock:
+            cached = {key: self._chunk_cache[key] for key in keys if key in self._chunk_cache}
+            for key in cached:
+                self._chunk_cache.move_to_end(key)
+
+        missing = list(OrderedDict((key, chunk) for key, chunk in zip(keys, chunks) if key not in cached).items())
+        logger.info(f"🧩 Map step: {len(chunks)} chunks, {len(chunks) - len(missing)} from cache")
+
+        for start in range(0, len(missing), CHUNK_BATCH_SIZE):
+            batch = missing[start:start + CHUNK_BATCH_SIZE]
+            raw_summaries = self._generate_raw([chunk for _, chunk in batch], profile)
+            for (key, _), raw_summary in zip(batch, raw_summaries):
+                cached[key] = self.clean_output(raw_summary)
+
+        with self._chunk_cache_lock:
+            for key, _ in missing:
+                self._chunk_cache[key] = cached[key]
+            while len(self._chunk_cache) > self.chunk_cache_size:
+                self._chunk_cache.popitem(last=False)
+
+        return [cached[key] for key in keys]
+
+    def generate_long(self, text: str, profile: str = DEFAULT_PROFILE) -> str:
+        """
+        Map-reduce summarization for transcripts beyond the encoder limit:
+        summarize speaker-turn chunks, then summarize the joined chunk summaries.
+        """
+        return self.clean_output(self._generate_raw([self._map_step(text, profile)], profile)[0])
+
+    def _map_step(self, text: str, profile: str = DEFAULT_PROFILE) -> str:
+        """Replace an over-long transcript by its joined chunk summaries until it fits the encoder."""
+        # Very long visits may need more than one reduce level
+        while self.count_tokens(text) > MAX_INPUT_TOKENS:
+            chunk_summaries = self._summarize_chunks(self.split_into_chunks(text), profile)
+            text = "\n".join(chunk_summaries)
+            if len(chunk_summaries) == 1:
+                break
+        return text
+
+    def generate_soap(self, text: str, profile: str = DEFAULT_PROFILE,
+                      include_full_summary: bool = True) -> Dict[str, str]:
+        """
+        Generate the full summary and all four SOAP sections from one encoder pass.
+
+        The transcript is encoded once and the encoder states are shared by every
+        decode. The full summary is decoded from the bare start token, exactly as
+        generate() would; section prompts ('Subjective:', 'Objective:', ...) are
+        batched by token length, because BART derives decoder positions from the
+        step count and a padded prompt would be decoded at shifted positions.
+        The onnx backend has no separate encoder and re-encodes per decode.
+        Pass include_full_summary=False when the full summary is already cached.
+        """
+        names = [name for name in SOAP_PROMPTS if include_full_summary or name != 'full_summary']
+        if not text or len(text.strip()) < 30:
+            return {name: INSUFFICIENT_DATA for name in names}
+
+        try:
             inputs = self.tokenizer(
-                input_text,
+                "summarize: " + self._map_step(text, profile),
                 return_tensors="pt",
                 truncation=True,
-                max_length=1024
+                max_length=MAX_INPUT_TOKENS
             ).to(self.device)
 
-            output_ids = self.model.generate(
-                input_ids=inputs.input_ids,
-                max_new_tokens=150,
-                min_new_tokens=40,
-                num_beams=4,
-                repetition_penalty=1.2,
-                no_repeat_ngram_size=3,
-                early_stopping=True
-            )
+            encoded = None
+            if self.backend != 'onnx':
+                with torch.no_grad():
+                    encoded = self.model.get_encoder()(
+                        input_ids=inputs.input_ids,
+                        attention_mask=inputs.attention_mask
+                    )
 
-            raw_summary = self.tokenizer.decode(output_ids[0], skip_special_tokens=True)
+            sections = {}
+            if include_full_summary:
+                output_ids = self.model.generate(
+                    **self._soap_model_inputs(inputs, encoded, 1),
+                    **DECODING_PROFILES[profile]
+                )
+                sections['full_summary'] = self.clean_output(
+                    self.tokenizer.decode(output_ids[0], skip_special_tokens=True)
+                )
 
-            # Apply the cleaning layer
-            return self.clean_output(raw_summary)
+            for group, decoder_input_ids in self._soap_decoder_prompts():
+                output_ids = self.model.generate(
+                    **self._soap_model_inputs(inputs, encoded, len(group)),
+                    decoder_input_ids=decoder_input_ids,
+                    **DECODING_PROFILES[profile]
+                )
+                # Drop the prompt tokens; only the generated continuation is the section text
+                texts = self.tokenizer.batch_decode(
+                    output_ids[:, decoder_input_ids.shape[1]:],
+                    skip_special_tokens=True
+                )
+                for name, section in zip(group, texts):
+                    sections[name] = self.clean_output(section)
+
+            return {name: sections[name] for name in names}
 
         except Exception as e:
             logger.error(f"Inference Error: {e}")
-            return "Error generating clinical summary."
\ No newline at end of file
+            return {name: GENERATION_ERROR for name in names}
+
+    @staticmethod
+    def _soap_model_inputs(inputs, encoded, rows: int) -> Dict:
+        """Encoder side of a SOAP generate() call with `rows` decoder prompts."""
+        model_inputs = {'attention_mask': inputs.attention_mask.expand(rows, -1)}
+        if encoded is None:
+            model_inputs['input_ids'] = inputs.input_ids.expand(rows, -1)
+        else:
+            # expand() is a view: every prompt attends to the same encoder states
+            model_inputs['encoder_outputs'] = BaseModelOutput(
+                last_hidden_state=encoded.last_hidden_state.expand(rows, -1, -1)
+            )
+        return model_inputs
+
+    def _soap_decoder_prompts(self) -> List:
+        """
+        Decoder prompts of the four SOAP sections, grouped by token length
+
+        Returns:
+            (section names, (rows, length) prompt ids) per group; no row is padded
+        """
+        config = self.model.config
+        prefix = [config.decoder_start_token_id]
+        bos_id = getattr(self.model.generation_config, "forced_bos_token_id", None)
+        if bos_id is not None:
+            prefix.append(bos_id)
+
+        groups = OrderedDict()
+        for name, prompt in SOAP_PROMPTS.items():
+            if not prompt:
+                continue
+            ids = prefix + self.tokenizer(prompt, add_special_tokens=False).input_ids
+            groups.setdefault(len(ids), []).append((name, ids))
+
+        return [
+            ([name for name, _ in group], torch.tensor([ids for _, ids in group], device=self.device))
+            for group in groups.values()
+        ]
+
+    def generate_stream(self, text: str) -> Generator[str, None, str]:
+        """
+        Yield the cleaned summary incrementally while greedy decoding runs in a background thread.
+
+        The concatenated pieces form the summary; the generator's return value
+        (StopIteration.value) is the fully cleaned text that should be persisted,
+        or GENERATION_ERROR if decoding failed, even after some text was streamed.
+        """
+        if not text or len(text.strip()) < 30:
+            yield INSUFFICIENT_DATA
+            return INSUFFICIENT_DATA
+
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        inputs = self.tokenizer(
+            "summarize: " + self._map_step(text),
+            return_tensors="pt",
+            truncation=True,
+            max_length=MAX_INPUT_TOKENS
+        ).to(self.device)
+
+        failed = threading.Event()
+
+        def run_generation():
+            try:
+                self.model.generate(
+                    input_ids=inputs.input_ids,
+                    attention_mask=inputs.attention_mask,
+                    streamer=streamer,
+                    # Streaming is greedy, so the draft model can always assist
+                    assistant_model=self.draft_model,
+                    **STREAM_GENERATION_KWARGS
+                )
+            except Exception as e:
+                logger.error(f"Inference Error: {e}")
+                failed.set()
+                streamer.end()
+
+        worker = threading.Thread(target=run_generation, daemon=True)
+        worker.start()
+
+        cleaner = StreamingCleaner(self.clean_output)
+        for piece in streamer:
+            delta = cleaner.feed(piece)
+            if delta:
+                yield delta
+        worker.join()
+
+        if failed.is_set():
+            return GENERATION_ERROR
+
+        delta = cleaner.finish()
+        if delta:
+            yield delta
+        return cleaner.summary or GENERATION_ERROR
+
+
+class StreamingCleaner:
+    """
+    Applies Summarizer.clean_output incrementally to streamed text
+
+    The last word is held back because the next token may still extend
+    it, and so is a trailing 'Speaker' that may turn into a 'Speaker 2:'
+    label. Everything before that is cleaned and only the new suffix of
+    the cleaned text is emitted.
+    """
+
+    def __init__(self, clean_fn):
+        self.clean_fn = clean_fn
+        self.raw = ""
+        self.emitted = ""
+        self.summary = ""
+
+    def _advance(self, cleaned: str) -> str:
+        if len(cleaned) > len(self.emitted) and cleaned.startswith(self.emitted):
+            delta = cleaned[len(self.emitted):]
+            self.emitted = cleaned
+            return delta
+        return ""
+
+    def feed(self, piece: str) -> str:
+        """Add raw generated text and return the newly stable cleaned text."""
+        self.raw += piece
+        words = list(re.finditer(r'\S+', self.raw))
+        stable = len(words) - 1
+        while stable > 0 and words[stable - 1].group().lower() == "speaker":
+            stable -= 1
+        if stable <= 0:
+            return ""
+        return self._advance(self.clean_fn(self.raw[:words[stable].start()], final=False))
+
+    def finish(self) -> str:
+        """Clean the complete text and return whatever has not been emitted yet."""
+        self.summary = self.clean_fn(self.raw)
+        return self._advance(self.summary)
\ No newline at end of file
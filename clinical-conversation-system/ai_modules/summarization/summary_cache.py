@@ -0,0 +1,126 @@
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from loguru import logger
+
+# Rough per-entry bookkeeping cost of the OrderedDict, on top of the strings
+_ENTRY_OVERHEAD_BYTES = 200
+
+
+def normalize_transcript(text: str) -> str:
+    """Collapse whitespace and blank lines so cosmetic differences share a cache entry."""
+    lines = (re.sub(r'\s+', ' ', line).strip() for line in (text or "").splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def make_summary_key(text: str, model_name: str, generation_kwargs: Dict) -> str:
+    """
+    Build the cache key for a summary
+
+    Args:
+        text: Raw transcript
+        model_name: Summarization model name
+        generation_kwargs: Decoding parameters that influence the output
+
+    Returns:
+        Hex digest identifying (normalized transcript, model, parameters)
+    """
+    payload = json.dumps({
+        'transcript': normalize_transcript(text),
+        'model': model_name,
+        'generation': generation_kwargs
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    Two-tier summary cache
+
+    The first tier is an in-process LRU bounded by an approximate memory
+    budget. The optional second tier is any object with `get(key)` and
+    `put(key, summary)` methods, e.g. a database-backed store shared by
+    all workers. Second-tier hits are promoted into the LRU.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, store=None):
+        """
+        Initialize summary cache
+
+        Args:
+            max_bytes: Memory budget of the in-process tier
+            store: Optional persistent second tier
+        """
+        self.max_bytes = max_bytes
+        self.store = store
+        self._memory = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _entry_size(key: str, summary: str) -> int:
+        return len(key) + len(summary.encode("utf-8")) + _ENTRY_OVERHEAD_BYTES
+
+    def _remember(self, key: str, summary: str):
+        if key in self._memory:
+            self._bytes -= self._entry_size(key, self._memory.pop(key))
+        self._memory[key] = summary
+        self._bytes += self._entry_size(key, summary)
+
+        while self._bytes > self.max_bytes and self._memory:
+            old_key, old_summary = self._memory.popitem(last=False)
+            self._bytes -= self._entry_size(old_key, old_summary)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached summary for a key, or None on a miss."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+        summary = None
+        if self.store is not None:
+            try:
+                summary = self.store.get(key)
+            except Exception as e:
+                logger.warning(f"Summary cache store lookup failed: {e}")
+
+        with self._lock:
+            if summary is None:
+                self.misses += 1
+                return None
+            self._remember(key, summary)
+            self.store_hits += 1
+            return summary
+
+    def put(self, key: str, summary: str):
+        """Store a summary in both tiers."""
+        with self._lock:
+            self._remember(key, summary)
+
+        if self.store is not None:
+            try:
+                self.store.put(key, summary)
+            except Exception as e:
+                logger.warning(f"Summary cache store write failed: {e}")
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring."""
+        with self._lock:
+            lookups = self.memory_hits + self.store_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'store_hits': self.store_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.store_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._bytes
+            }
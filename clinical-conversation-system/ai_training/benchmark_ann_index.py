@@ -0,0 +1,113 @@
+"""
+Benchmark the similar-case ANN indexes: recall@k and latency vs exact search
+File: ai_training/benchmark_ann_index.py
+
+Uses an .npy matrix of embeddings when given (e.g. exported from the
+conversation_embeddings table), otherwise clustered synthetic unit vectors
+shaped like all-MiniLM-L6-v2 output. Queries are perturbed copies of
+collection vectors; ground truth is the exact top-k by inner product.
+The HNSW rows are skipped when faiss-cpu is not installed.
+
+Usage:
+    python ai_training/benchmark_ann_index.py --size 200000 --k 10
+    python ai_training/benchmark_ann_index.py --embeddings embeddings.npy --nprobe 4 8 16 32
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from ai_modules.retrieval.ann_index import build_index
+
+
+def unit(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def synthetic_collection(size: int, dim: int, clusters: int, rng) -> np.ndarray:
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = np.empty((size, dim), dtype=np.float32)
+    for start in range(0, size, 65536):
+        stop = min(size, start + 65536)
+        vectors[start:stop] = centers[rng.integers(0, clusters, stop - start)]
+        vectors[start:stop] += 0.6 * rng.normal(size=(stop - start, dim)).astype(np.float32)
+    return unit(vectors)
+
+
+def exact_top_k(collection: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ collection.T
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def evaluate(search, queries: np.ndarray, truth: np.ndarray, k: int):
+    """Mean recall@k and ms/query for one search configuration"""
+    started = time.perf_counter()
+    results = [search(query) for query in queries]
+    per_query_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    recall = np.mean([
+        len(set(truth[i].tolist()) & {int(item_id) for item_id, _ in hits}) / k
+        for i, hits in enumerate(results)
+    ])
+    return recall, per_query_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN index recall/latency benchmark")
+    parser.add_argument("--embeddings", default=None, help=".npy matrix of embeddings (default: synthetic)")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.embeddings:
+        collection = unit(np.load(args.embeddings))
+    else:
+        collection = synthetic_collection(args.size, args.dim, args.clusters, rng)
+    picks = rng.choice(len(collection), args.queries, replace=False)
+    queries = unit(collection[picks] + 0.3 * rng.normal(size=(args.queries, collection.shape[1])).astype(np.float32))
+    ids = [str(i) for i in range(len(collection))]
+
+    print("=" * 60)
+    print(f"🧭 ANN INDEX BENCHMARK ({len(collection)} x {collection.shape[1]}, recall@{args.k})")
+    print("=" * 60)
+
+    truth = exact_top_k(collection, queries, args.k)
+    started = time.perf_counter()
+    for query in queries:
+        np.argpartition(-(collection @ query), args.k - 1)[:args.k]
+    exact_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    print(f"✅ {'exact':>14}: recall 1.000 | {exact_ms:8.3f} ms/query")
+
+    started = time.perf_counter()
+    ivf = build_index(ids, collection, backend='ivf')
+    print(f"🗂️ IVF built in {time.perf_counter() - started:.1f} s ({len(ivf.centroids)} cells)")
+    for nprobe in args.nprobe:
+        recall, ms = evaluate(lambda q: ivf.search(q, args.k, nprobe=nprobe), queries, truth, args.k)
+        print(f"✅ {f'ivf nprobe={nprobe}':>14}: recall {recall:.3f} | {ms:8.3f} ms/query")
+
+    try:
+        started = time.perf_counter()
+        hnsw = build_index(ids, collection, backend='hnsw')
+        print(f"🗂️ HNSW built in {time.perf_counter() - started:.1f} s")
+        for ef in args.ef_search:
+            recall, ms = evaluate(lambda q: hnsw.search(q, args.k, ef_search=ef), queries, truth, args.k)
+            print(f"✅ {f'hnsw ef={ef}':>14}: recall {recall:.3f} | {ms:8.3f} ms/query")
+    except ImportError:
+        print("⚠️ faiss-cpu not installed, skipping HNSW")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark assisted (speculative) decoding for the clinical summarizer
+File: ai_training/benchmark_assisted_decoding.py
+
+Compares three ways of decoding the same transcripts from clinical_test.json:
+  1. beam search (num_beams=4)  - the 'quality' profile used by /summarize
+  2. plain greedy search        - what assisted decoding must reproduce
+  3. assisted greedy search     - draft model proposes, main model verifies
+
+Usage:
+    python ai_training/benchmark_assisted_decoding.py --draft sshleifer/distilbart-cnn-12-6 --samples 20
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import torch
+from rouge_score import rouge_scorer
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from ai_modules.summarization.summarizer import Summarizer, DECODING_PROFILES, MAX_INPUT_TOKENS
+
+BEAM_KWARGS = DECODING_PROFILES['quality']
+GREEDY_KWARGS = {**BEAM_KWARGS, 'num_beams': 1, 'early_stopping': False}
+
+
+def decode(summarizer: Summarizer, text: str, generation_kwargs: dict, assistant=None):
+    """Generate one summary; returns (text, generated token count, seconds)"""
+    inputs = summarizer.tokenizer(
+        "summarize: " + text,
+        return_tensors="pt",
+        truncation=True,
+        max_length=MAX_INPUT_TOKENS
+    ).to(summarizer.device)
+
+    extra = {'assistant_model': assistant} if assistant is not None else {}
+    started = time.perf_counter()
+    with torch.no_grad():
+        output_ids = summarizer.model.generate(
+            input_ids=inputs.input_ids,
+            attention_mask=inputs.attention_mask,
+            **generation_kwargs,
+            **extra
+        )
+    elapsed = time.perf_counter() - started
+
+    tokens = int((output_ids[0] != summarizer.tokenizer.pad_token_id).sum())
+    return summarizer.tokenizer.decode(output_ids[0], skip_special_tokens=True), tokens, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assisted decoding benchmark")
+    parser.add_argument("--model", default="facebook/bart-large-cnn")
+    parser.add_argument("--draft", default="sshleifer/distilbart-cnn-12-6")
+    parser.add_argument("--data", default=os.path.join(PROJECT_ROOT, "clinical_test.json"))
+    parser.add_argument("--samples", type=int, default=20)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⚡ ASSISTED DECODING BENCHMARK")
+    print("=" * 60)
+    print(f"Main model:  {args.model}")
+    print(f"Draft model: {args.draft}")
+
+    summarizer = Summarizer(model_name=args.model, draft_model_name=args.draft)
+    if summarizer.draft_model is None:
+        print("❌ Draft model could not be loaded; nothing to compare.")
+        return
+
+    with open(args.data, 'r', encoding='utf-8') as f:
+        samples = [s['transcript'] for s in json.load(f) if s.get('transcript')][:args.samples]
+    print(f"Samples:     {len(samples)}")
+
+    # Warm-up so lazy initialisation does not pollute the first timing
+    decode(summarizer, samples[0], GREEDY_KWARGS, summarizer.draft_model)
+
+    totals = {name: {'tokens': 0, 'seconds': 0.0} for name in ('beam4', 'greedy', 'assisted')}
+    same_as_greedy = 0
+    same_as_beam = 0
+    scorer = rouge_scorer.RougeScorer(['rougeL'], use_stemmer=True)
+    rouge_vs_beam = []
+
+    for i, text in enumerate(samples):
+        beam_text, beam_tokens, beam_s = decode(summarizer, text, BEAM_KWARGS)
+        greedy_text, greedy_tokens, greedy_s = decode(summarizer, text, GREEDY_KWARGS)
+        assisted_text, assisted_tokens, assisted_s = decode(summarizer, text, GREEDY_KWARGS, summarizer.draft_model)
+
+        for name, tokens, seconds in (('beam4', beam_tokens, beam_s),
+                                      ('greedy', greedy_tokens, greedy_s),
+                                      ('assisted', assisted_tokens, assisted_s)):
+            totals[name]['tokens'] += tokens
+            totals[name]['seconds'] += seconds
+
+        same_as_greedy += assisted_text == greedy_text
+        same_as_beam += assisted_text == beam_text
+        rouge_vs_beam.append(scorer.score(beam_text, assisted_text)['rougeL'].fmeasure)
+
+        print(f"✅ Sample {i + 1}: beam4 {beam_s:.2f}s | greedy {greedy_s:.2f}s | assisted {assisted_s:.2f}s")
+
+    print("-" * 60)
+    for name, total in totals.items():
+        rate = total['tokens'] / total['seconds'] if total['seconds'] else 0.0
+        print(f"{name:>9}: {rate:7.1f} tokens/sec  ({total['seconds']:.1f}s total)")
+
+    speedup = totals['beam4']['seconds'] / totals['assisted']['seconds'] if totals['assisted']['seconds'] else 0.0
+    print(f"\n📊 Assisted vs beam4 wall-clock speedup: {speedup:.2f}x")
+    print(f"📊 Assisted output identical to greedy: {same_as_greedy}/{len(samples)}")
+    print(f"📊 Assisted output identical to beam4:  {same_as_beam}/{len(samples)}")
+    print(f"📊 Mean ROUGE-L of assisted vs beam4:   {sum(rouge_vs_beam) / len(rouge_vs_beam):.4f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark inference backends (fp32 / int8 / onnx) for the summarizer and the history retriever
+File: ai_training/benchmark_backends.py
+
+Each backend is loaded in a fresh process so resident memory is measured
+without the other backends' weights. Outputs are compared against fp32:
+  - Summarizer: latency, ROUGE-L vs the fp32 summary and vs the reference summary
+  - Retriever:  latency, cosine similarity of each embedding to its fp32 embedding
+
+Usage:
+    python ai_training/benchmark_backends.py --samples 20 --backends fp32 int8 onnx
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from rouge_score import rouge_scorer
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from ai_modules.model_backends import BACKENDS
+
+
+def rss_mb() -> float:
+    """Resident memory of this process in MB (peak RSS when psutil is not installed)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_backend(backend: str, transcripts, profile: str, summarizer_model: str, embedding_model: str):
+    """Load both models with one backend and time them on the samples (runs in a child process)."""
+    sys.path.append(PROJECT_ROOT)
+    from ai_modules.summarization.summarizer import Summarizer
+    from ai_modules.retrieval.history_retriever import PatientHistoryRetriever
+
+    baseline_mb = rss_mb()
+    summarizer = Summarizer(model_name=summarizer_model, backend=backend)
+    retriever = PatientHistoryRetriever(model_name=embedding_model, backend=backend)
+    loaded_mb = rss_mb()
+
+    # Warm-up so one-time graph/session setup does not count as latency
+    summarizer.generate(transcripts[0], profile)
+    retriever.encode_texts(transcripts[:1])
+
+    summaries, summary_ms = [], []
+    for text in transcripts:
+        started = time.perf_counter()
+        summaries.append(summarizer.generate(text, profile))
+        summary_ms.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    embeddings = retriever.encode_texts(transcripts)
+    embed_ms = (time.perf_counter() - started) * 1000 / len(transcripts)
+
+    return {
+        'backend': summarizer.backend,
+        'model_mb': loaded_mb - baseline_mb,
+        'peak_mb': rss_mb(),
+        'summaries': summaries,
+        'summary_ms': summary_ms,
+        'embeddings': embeddings,
+        'embed_ms': embed_ms
+    }
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference backend benchmark")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--summarizer-model", default="facebook/bart-large-cnn")
+    parser.add_argument("--embedding-model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--profile", default="quality")
+    parser.add_argument("--data", default=os.path.join(PROJECT_ROOT, "clinical_test.json"))
+    parser.add_argument("--samples", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.data, 'r', encoding='utf-8') as f:
+        data = [s for s in json.load(f) if s.get('transcript')][:args.samples]
+    transcripts = [s['transcript'] for s in data]
+    references = [s.get('summary', '') for s in data]
+
+    backends = ['fp32'] + [b for b in args.backends if b != 'fp32']
+
+    print("=" * 60)
+    print("🏁 INFERENCE BACKEND BENCHMARK")
+    print("=" * 60)
+    print(f"Summarizer: {args.summarizer_model} (profile={args.profile})")
+    print(f"Embeddings: {args.embedding_model}")
+    print(f"Samples:    {len(transcripts)}")
+    print(f"Backends:   {', '.join(backends)}")
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for backend in backends:
+        print(f"\n⏳ Running {backend}...")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            try:
+                results[backend] = pool.submit(
+                    run_backend, backend, transcripts, args.profile,
+                    args.summarizer_model, args.embedding_model
+                ).result()
+            except Exception as e:
+                print(f"❌ {backend} failed: {e}")
+                continue
+        if results[backend]['backend'] != backend:
+            print(f"⚠️ {backend} was not available here, ran as {results[backend]['backend']}")
+
+    if 'fp32' not in results:
+        print("❌ fp32 baseline failed; nothing to compare against.")
+        return
+
+    scorer = rouge_scorer.RougeScorer(['rougeL'], use_stemmer=True)
+    baseline = results['fp32']
+
+    print("\n" + "-" * 96)
+    print(f"{'backend':>8} | {'sum p50 ms':>10} | {'sum p95 ms':>10} | {'emb ms':>7} | {'model MB':>8} | "
+          f"{'peak MB':>7} | {'R-L vs fp32':>11} | {'R-L vs ref':>10} | {'min cos':>7}")
+    print("-" * 96)
+    for backend, r in results.items():
+        rouge_fp32 = np.mean([scorer.score(b, s)['rougeL'].fmeasure
+                              for b, s in zip(baseline['summaries'], r['summaries'])])
+        rouge_ref = np.mean([scorer.score(ref, s)['rougeL'].fmeasure
+                             for ref, s in zip(references, r['summaries'])])
+        cosine = cosine_rows(baseline['embeddings'], r['embeddings'])
+
+        print(f"{backend:>8} | {np.percentile(r['summary_ms'], 50):10.0f} | "
+              f"{np.percentile(r['summary_ms'], 95):10.0f} | {r['embed_ms']:7.1f} | "
+              f"{r['model_mb']:8.0f} | {r['peak_mb']:7.0f} | {rouge_fp32:11.4f} | "
+              f"{rouge_ref:10.4f} | {cosine.min():7.4f}")
+    print("=" * 96)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Micro-benchmark: compiled PatternMatcher vs one re.finditer per pattern
+File: ai_training/benchmark_pattern_matcher.py
+
+Builds ~10k-word transcripts from clinical_test.json, checks that both
+paths return identical spans and reports the time per transcript. The
+"single line" variant joins the transcript into one line, the worst case
+for lazy 'keyword.*?(value)' patterns.
+
+Usage:
+    python ai_training/benchmark_pattern_matcher.py --words 10000 --repeat 20
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from ai_modules.entity_extraction.extractor import ENTITY_PATTERNS
+from ai_modules.entity_extraction.pattern_matcher import PatternMatcher
+
+
+def legacy_match(text: str):
+    """The previous implementation: every pattern scans the whole text"""
+    results = {}
+    for category, patterns in ENTITY_PATTERNS.items():
+        spans = results.setdefault(category, [])
+        for pattern in patterns:
+            spans.extend(m.span() for m in re.finditer(pattern, text, re.IGNORECASE))
+    return results
+
+
+def build_transcript(transcripts, words: int) -> str:
+    lines = []
+    count = 0
+    i = 0
+    while count < words:
+        for line in transcripts[i % len(transcripts)].splitlines():
+            lines.append(line)
+            count += len(line.split())
+        i += 1
+    return "\n".join(lines)
+
+
+def time_ms(fn, text: str, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pattern matcher micro-benchmark")
+    parser.add_argument("--data", default=os.path.join(PROJECT_ROOT, "clinical_test.json"))
+    parser.add_argument("--words", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.data, 'r', encoding='utf-8') as f:
+        transcripts = [s['transcript'] for s in json.load(f) if s.get('transcript')]
+
+    matcher = PatternMatcher(ENTITY_PATTERNS)
+    multi_line = build_transcript(transcripts, args.words)
+    variants = {
+        'multi-line': multi_line,
+        'single line': multi_line.replace("\n", " "),
+        'no values': re.sub(r'\d', 'x', multi_line.replace("\n", " "))
+    }
+
+    print("=" * 60)
+    print(f"🔎 PATTERN MATCHER BENCHMARK ({args.words} words, {args.repeat} runs)")
+    print("=" * 60)
+    for name, text in variants.items():
+        expected = legacy_match(text)
+        if matcher.match(text) != expected:
+            print(f"❌ {name}: PatternMatcher output differs from re.finditer")
+            sys.exit(1)
+
+        legacy_ms = time_ms(legacy_match, text, args.repeat)
+        compiled_ms = time_ms(matcher.match, text, args.repeat)
+        matches = sum(len(spans) for spans in expected.values())
+        print(f"✅ {name:>11}: {matches:5d} matches | re.finditer {legacy_ms:8.2f} ms | "
+              f"PatternMatcher {compiled_ms:7.2f} ms | {legacy_ms / compiled_ms:5.1f}x")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark the full spaCy pipeline against the trimmed one the extractor loads
+File: ai_training/benchmark_spacy_pipeline.py
+
+Each configuration is loaded in a fresh process so the memory numbers only
+include that pipeline. NER does not read tagger or lemmatizer output, but
+the parser runs before it and its sentence boundaries can shift an entity,
+so entity agreement between the two pipelines is reported as well.
+
+Usage:
+    python ai_training/benchmark_spacy_pipeline.py --model en_core_sci_sm --samples 80
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from ai_modules.entity_extraction.extractor import UNUSED_COMPONENTS
+
+
+def rss_mb() -> float:
+    """Resident memory of this process in MB (peak RSS when psutil is not installed)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_pipeline(model: str, exclude, texts, repeat: int):
+    """Load one pipeline configuration and time it (runs in a child process)."""
+    import spacy
+
+    baseline_mb = rss_mb()
+    nlp = spacy.load(model, exclude=list(exclude))
+    loaded_mb = rss_mb()
+
+    # Warm-up
+    list(nlp.pipe(texts[:2]))
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        docs = [nlp(text) for text in texts]
+    per_doc_ms = (time.perf_counter() - started) * 1000 / (repeat * len(texts))
+
+    return {
+        'pipe_names': list(nlp.pipe_names),
+        'model_mb': loaded_mb - baseline_mb,
+        'peak_mb': rss_mb(),
+        'per_doc_ms': per_doc_ms,
+        'ents': [[(ent.start_char, ent.end_char, ent.label_) for ent in doc.ents] for doc in docs]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="spaCy pipeline trimming benchmark")
+    parser.add_argument("--model", default=os.getenv("SPACY_MODEL_PATH") or "en_core_sci_sm")
+    parser.add_argument("--data", default=os.path.join(PROJECT_ROOT, "clinical_test.json"))
+    parser.add_argument("--samples", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.data, 'r', encoding='utf-8') as f:
+        texts = [s['transcript'] for s in json.load(f) if s.get('transcript')][:args.samples]
+
+    print("=" * 60)
+    print("✂️ SPACY PIPELINE BENCHMARK")
+    print("=" * 60)
+    print(f"Model:   {args.model}")
+    print(f"Samples: {len(texts)} x {args.repeat}")
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for name, exclude in (('full', ()), ('trimmed', UNUSED_COMPONENTS)):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[name] = pool.submit(run_pipeline, args.model, exclude, texts, args.repeat).result()
+        print(f"✅ {name:>7}: {', '.join(results[name]['pipe_names'])}")
+
+    full, trimmed = results['full'], results['trimmed']
+    print("-" * 60)
+    for name, r in results.items():
+        print(f"{name:>7}: {r['per_doc_ms']:7.2f} ms/doc | model {r['model_mb']:6.0f} MB | peak {r['peak_mb']:6.0f} MB")
+    print("-" * 60)
+    print(f"📊 Latency saved: {100 * (1 - trimmed['per_doc_ms'] / full['per_doc_ms']):.0f}% per document")
+    print(f"📊 Memory saved:  {full['model_mb'] - trimmed['model_mb']:.0f} MB per worker")
+    full_ents = {(i, ent) for i, ents in enumerate(full['ents']) for ent in ents}
+    trimmed_ents = {(i, ent) for i, ents in enumerate(trimmed['ents']) for ent in ents}
+    union = full_ents | trimmed_ents
+    agreement = len(full_ents & trimmed_ents) / len(union) if union else 1.0
+    print(f"📊 Entity agreement: {100 * agreement:.1f}% "
+          f"({len(full_ents)} full, {len(trimmed_ents)} trimmed)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 import whisper
 import pandas as pd
 import os
+import sys
 from jiwer import wer
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from ai_modules.speech_recognition.audio_preprocessor import load_audio
+
 # 1. SETUP
 # Use 'small' or 'medium' for better medical accuracy if your GPU can handle it
 model = whisper.load_model("base")
@@ -23,8 +27,8 @@ for index, row in df.iterrows():
     if not os.path.exists(audio_path):
         continue
 
-    # Whisper hears the audio
-    audio_result = model.transcribe(audio_path)
+    # Whisper hears the audio (decoded once, reused from the .npy on later runs)
+    audio_result = model.transcribe(load_audio(audio_path, persist=True))
     predicted_text = audio_result["text"].strip()
     reference_text = row['transcript'].strip()
 
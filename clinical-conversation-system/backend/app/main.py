@@ -1,24 +1,40 @@
 import sys
 import os
+import json
+import asyncio
 import shutil
 import uuid
 import re
-from typing import Dict, List
+from typing import Dict, List, Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
-from fastapi import APIRouter, FastAPI, Depends, HTTPException, status, UploadFile, File
+from fastapi import (
+    APIRouter, FastAPI, Depends, HTTPException, status, UploadFile, File, BackgroundTasks,
+    WebSocket, WebSocketDisconnect
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from loguru import logger
 
 # Project Imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
-from backend.config.database import get_db, init_db
+from backend.config.database import get_db, init_db, SessionLocal
 from backend.app.models.models import (
     User, Doctor, Patient, Conversation,
     ExtractedEntity, ClinicalSummary, MedicalHistory
 )
 from backend.app.schemas.schemas import *
+from backend.utils.summary_store import DatabaseSummaryStore
+from backend.utils.entity_store import (
+    replace_conversation_entities, delete_conversation_entities, stored_entity_spans, apply_entity_delta
+)
+from backend.utils.embedding_store import (
+    conversation_record, conversation_vectors, load_embeddings, load_pooled_embeddings,
+    delete_conversation_embedding
+)
+from backend.utils.lexical_store import lexical_documents
 from backend.utils.auth import (
     get_password_hash, verify_password, create_access_token,
     get_current_active_user, get_current_doctor, get_current_patient
@@ -26,10 +42,21 @@ from backend.utils.auth import (
 
 # AI Modules
 from ai_modules.speech_recognition.transcriber import SpeechRecognizer
+from ai_modules.speech_recognition.audio_preprocessor import preprocess_audio
+from ai_modules.speech_recognition.transcription_cache import TranscriptionCache
+from ai_modules.speech_recognition.streaming import StreamingTranscriber
 from ai_modules.entity_extraction.extractor import ClinicalEntityExtractor
+from ai_modules.entity_extraction.gazetteer import DEFAULT_TERMS_PATH
+from ai_modules.entity_extraction.incremental import plan_entity_update
 # Ensure your filename is 'summarizer.py' and class is 'Summarizer'
-from ai_modules.summarization.summarizer import Summarizer
+from ai_modules.summarization.summarizer import (
+    Summarizer, STREAM_GENERATION_KWARGS, GENERATION_ERROR, DECODING_PROFILES, DEFAULT_PROFILE
+)
+from ai_modules.summarization.batcher import SummaryBatcher
+from ai_modules.summarization.summary_cache import SummaryCache, make_summary_key
 from ai_modules.retrieval.history_retriever import PatientHistoryRetriever
+from ai_modules.retrieval.ann_index import build_index
+from ai_modules.retrieval.lexical_index import BM25Index
 
 app = FastAPI(title="Clinical AI System", version="1.1.0")
 
@@ -43,20 +70,33 @@ os.makedirs(f"{UPLOAD_DIR}/audio", exist_ok=True)
 speech_recognizer = None
 entity_extractor = None
 clinical_summarizer = None
+summary_batcher = None
+summary_cache = None
 history_retriever = None
+case_index = None
+lexical_index = None
 
 
 def get_speech_recognizer():
     global speech_recognizer
     if not speech_recognizer:
-        speech_recognizer = SpeechRecognizer(model_name="base")
+        speech_recognizer = SpeechRecognizer(
+            model_name="base",
+            parallel_workers=int(os.getenv("WHISPER_PARALLEL_WORKERS", "0")),
+            cache=TranscriptionCache(cache_dir=f"{UPLOAD_DIR}/cache/transcriptions")
+        )
     return speech_recognizer
 
 
 def get_entity_extractor():
     global entity_extractor
     if not entity_extractor:
-        entity_extractor = ClinicalEntityExtractor()
+        entity_extractor = ClinicalEntityExtractor(
+            # Unpacked model directory for offline installs; otherwise the installed en_core_sci_sm package
+            model_path=os.getenv("SPACY_MODEL_PATH") or None,
+            gazetteer_path=os.getenv("GAZETTEER_PATH", DEFAULT_TERMS_PATH),
+            gazetteer_cache_path=f"{UPLOAD_DIR}/cache/gazetteer.pkl"
+        )
     return entity_extractor
 
 
@@ -69,17 +109,134 @@ def get_clinical_summarizer():
     if not clinical_summarizer:
         logger.info("📡 Initializing BART-Large-CNN from Hugging Face...")
         # Using the class name 'Summarizer' from your summarizer.py
-        clinical_summarizer = Summarizer(model_name="facebook/bart-large-cnn")
+        clinical_summarizer = Summarizer(
+            model_name="facebook/bart-large-cnn",
+            # e.g. sshleifer/distilbart-cnn-12-6 to speed up greedy profiles with assisted decoding
+            draft_model_name=os.getenv("SUMMARY_DRAFT_MODEL") or None,
+            # fp32 (default), int8 (dynamic quantization, CPU) or onnx (needs optimum[onnxruntime])
+            backend=os.getenv("MODEL_BACKEND", "fp32")
+        )
     return clinical_summarizer
 
 
+def get_summary_batcher():
+    """Shared micro-batching queue so concurrent /summarize calls share one generate() call."""
+    global summary_batcher
+    if not summary_batcher:
+        summary_batcher = SummaryBatcher(
+            get_clinical_summarizer(),
+            max_batch_size=int(os.getenv("SUMMARY_MAX_BATCH_SIZE", "8")),
+            max_wait_ms=float(os.getenv("SUMMARY_MAX_WAIT_MS", "20"))
+        )
+    return summary_batcher
+
+
+def get_summary_cache():
+    """In-process LRU in front of the summary_cache table."""
+    global summary_cache
+    if not summary_cache:
+        summary_cache = SummaryCache(
+            max_bytes=int(os.getenv("SUMMARY_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+            store=DatabaseSummaryStore(get_clinical_summarizer().cache_name)
+        )
+    return summary_cache
+
+
+def resolve_profile(profile: Optional[str], latency_budget_ms: Optional[float]) -> str:
+    """Explicit profile wins; otherwise fit the latency budget given the current queue."""
+    if profile:
+        if profile not in DECODING_PROFILES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown profile '{profile}'. Choose one of: {', '.join(DECODING_PROFILES)}"
+            )
+        return profile
+    if latency_budget_ms is not None:
+        return get_clinical_summarizer().select_profile(latency_budget_ms, get_summary_batcher().estimated_wait_ms())
+    # 'fast' when SUMMARY_DRAFT_MODEL is set, so assisted decoding reaches the per-visit path
+    return get_clinical_summarizer().default_profile
+
+
+async def summarize_text(text: str, profile: str = DEFAULT_PROFILE) -> str:
+    """Return a cached summary for identical (normalized) input, else generate one via the batcher."""
+    cache = get_summary_cache()
+    cache_key = make_summary_key(text, get_clinical_summarizer().cache_name, DECODING_PROFILES[profile])
+
+    summary = cache.get(cache_key)
+    if summary is not None:
+        logger.info(f"⚡ Summary cache hit ({cache.stats()})")
+        return summary
+
+    # Awaiting the future frees the event loop so concurrent requests can join the batch
+    summary = await asyncio.wrap_future(get_summary_batcher().submit(text, profile))
+    if summary != GENERATION_ERROR:
+        cache.put(cache_key, summary)
+    return summary
+
+
 def get_history_retriever():
     global history_retriever
     if not history_retriever:
-        history_retriever = PatientHistoryRetriever()
+        history_retriever = PatientHistoryRetriever(backend=os.getenv("MODEL_BACKEND", "fp32"))
     return history_retriever
 
 
+def get_case_index(db: Session):
+    """Similar-case index over one pooled passage vector per stored conversation, built on first use."""
+    global case_index
+    if case_index is None or case_index.needs_rebuild:
+        retriever = get_history_retriever()
+        # Only the stored pooled vectors are read, never the passage matrices
+        ids, vectors = load_pooled_embeddings(db, retriever.cache_name, retriever.dimension)
+        # ivf (NumPy, default) or hnsw (needs faiss-cpu)
+        case_index = build_index(ids, vectors, backend=os.getenv("ANN_BACKEND", "ivf"))
+    return case_index
+
+
+def get_lexical_index(db: Session):
+    """BM25 index over every conversation's summary, transcript and entity values, built on first use."""
+    global lexical_index
+    if lexical_index is None:
+        index = BM25Index()
+        index.add_many(lexical_documents(db))
+        logger.info(f"🔤 Keyword index holds {len(index)} conversations")
+        lexical_index = index
+    return lexical_index
+
+
+def refresh_lexical_index(db: Session, conversation_id: str):
+    """Re-index one conversation after its transcript, summary or entities changed."""
+    if lexical_index is not None:
+        # Dropped first: a conversation left without text is not yielded again
+        lexical_index.remove(conversation_id)
+        lexical_index.add_many(lexical_documents(db, [conversation_id]))
+
+
+def refresh_conversation_embedding(db: Session, conversation_id: str):
+    """
+    Re-embed one conversation (only if its text changed) and update the similar-case index.
+    Vectors that cannot be recomputed are deleted instead of left stale.
+    """
+    conv = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    try:
+        embeddings = conversation_vectors(db, get_history_retriever(), [conversation_record(conv)])
+        db.commit()
+        if case_index is not None:
+            case_index.add([conversation_id], embeddings.pooled())
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not store embedding for {conversation_id}, it will be computed on first retrieval: {e}")
+        invalidate_conversation_embedding(db, conversation_id)
+
+
+def invalidate_conversation_embedding(db: Session, conversation_id: str):
+    """Drop a conversation's stored vectors and index entry after its transcript or summary changed."""
+    delete_conversation_embedding(db, conversation_id)
+    db.commit()
+    if case_index is not None:
+        case_index.remove(conversation_id)
+
+
 def clean_transcript(text: str) -> str:
     """Remove filler words and clean up transcript"""
     fillers = ['Um', 'Uh', 'Hmm', 'Yeah', 'Okay', 'Like', 'I mean', 'You know']
@@ -103,6 +260,17 @@ async def startup_event():
     logger.info("System Online: All clinical modules ready.")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers so reloads and exits do not leak processes"""
+    if speech_recognizer:
+        # Whisper worker processes of the silence-split transcription pool
+        speech_recognizer.close()
+    if summary_batcher:
+        summary_batcher.close()
+    logger.info("System Offline: background workers stopped.")
+
+
 # ==================== AUTH & PROFILES ====================
 
 @app.post("/api/v1/auth/register", response_model=UserResponse)
@@ -178,13 +346,16 @@ async def create_conversation(conv: ConversationCreate, db: Session = Depends(ge
 
 
 @app.post("/api/v1/conversations/{conversation_id}/upload-audio")
-async def upload_audio(conversation_id: str, audio: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_audio(conversation_id: str, background_tasks: BackgroundTasks, audio: UploadFile = File(...),
+                       db: Session = Depends(get_db)):
     path = f"{UPLOAD_DIR}/audio/{conversation_id}_{audio.filename}"
     with open(path, "wb") as f:
         shutil.copyfileobj(audio.file, f)
     db.query(Conversation).filter(Conversation.id == conversation_id).update(
         {"audio_file_path": path, "status": "recorded"})
     db.commit()
+    # Decode to 16 kHz PCM once, so every later transcription skips ffmpeg
+    background_tasks.add_task(preprocess_audio, path)
     return {"message": "Uploaded successfully", "path": path}
 
 
@@ -219,48 +390,184 @@ async def transcribe(conversation_id: str, db: Session = Depends(get_db)):
 
     conv.transcription = res['transcription']
     conv.status = "transcribed"
+    # Offsets of a previous extraction would point into the old transcript
+    delete_conversation_entities(db, clean_id)
     db.commit()
+    refresh_lexical_index(db, clean_id)
+    invalidate_conversation_embedding(db, clean_id)
 
     return {"transcription": conv.transcription, "lang": res['detected_language']}
 
+@app.websocket("/api/v1/conversations/{conversation_id}/stream")
+async def stream_transcription(websocket: WebSocket, conversation_id: str, db: Session = Depends(get_db)):
+    """
+    Live transcription while the consult is in progress.
+    The client sends binary frames of 16 kHz mono 16-bit PCM and a text "end" message when done.
+    The server pushes partial/final segment events and a closing "done" event with the transcript.
+    """
+    await websocket.accept()
+
+    conv = db.query(Conversation).filter(Conversation.id == conversation_id.strip()).first()
+    if not conv:
+        await websocket.send_json({"type": "error", "detail": f"Conversation with ID {conversation_id} not found."})
+        await websocket.close(code=4404)
+        return
+
+    stream = StreamingTranscriber(get_speech_recognizer())
+    connected = True
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                connected = False
+                break
+            if message.get("bytes"):
+                # Whisper runs in the threadpool so other sockets keep flowing
+                for event in await run_in_threadpool(stream.add_audio, message["bytes"]):
+                    await websocket.send_json(event)
+            elif message.get("text") == "end":
+                break
+    except WebSocketDisconnect:
+        connected = False
+
+    try:
+        events = await run_in_threadpool(stream.finish)
+    except Exception as e:
+        # The tail of the audio is lost, so the stored transcript stays as it was
+        logger.error(f"❌ Streaming transcription of {conversation_id} failed: {e}")
+        if connected:
+            try:
+                await websocket.send_json({"type": "error", "detail": f"Transcription failed: {e}"})
+                await websocket.close(code=1011)
+            except (WebSocketDisconnect, RuntimeError):
+                pass
+        return
+
+    if stream.lines:
+        # Keep whatever was captured even if the client dropped off
+        conv.transcription = stream.transcription
+        conv.status = "transcribed"
+        # Offsets of a previous extraction would point into the old transcript
+        delete_conversation_entities(db, conv.id)
+        db.commit()
+        refresh_lexical_index(db, conv.id)
+        invalidate_conversation_embedding(db, conv.id)
+        logger.info(f"🎙️ Streaming transcription stored for {conversation_id}")
+    else:
+        logger.info(f"🎙️ No speech captured for {conversation_id}, transcript left unchanged")
+
+    if connected:
+        try:
+            for event in events:
+                await websocket.send_json(event)
+            await websocket.send_json({
+                "type": "done",
+                # Empty when nothing was captured; the stored transcript was not touched
+                "transcription": stream.transcription,
+                "lang": stream.language
+            })
+            await websocket.close()
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+
+
 @app.post("/api/v1/conversations/{conversation_id}/extract-entities")
 async def extract(conversation_id: str, db: Session = Depends(get_db)):
     conv = db.query(Conversation).filter(Conversation.id == conversation_id).first()
     entities = get_entity_extractor().extract_entities(conv.transcription)
 
-    for cat, items in entities.items():
-        for item in items:
-            db.add(ExtractedEntity(
-                id=str(uuid.uuid4()),
-                conversation_id=conversation_id,
-                entity_type=cat,
-                entity_value=item.get('text', ''),
-                confidence_score=str(item.get('confidence', '0.0')),
-                start_position=item.get('start', 0),
-                end_position=item.get('end', 0),
-                context=item.get('context', '')
-            ))
+    # Re-running replaces the previous extraction instead of appending to it
+    replace_conversation_entities(db, conversation_id, entities)
     db.commit()
+    refresh_lexical_index(db, conversation_id)
     return {"status": "Entities extracted"}
 
 
+@app.patch("/api/v1/conversations/{conversation_id}", response_model=ConversationResponse)
+async def update_conversation(conversation_id: str, update: ConversationUpdate, db: Session = Depends(get_db)):
+    """
+    Edit a conversation. A corrected transcription only re-extracts the
+    changed lines; stored entities elsewhere keep their rows with shifted offsets.
+    """
+    conv = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    if not conv:
+        raise HTTPException(status_code=404, detail=f"Conversation with ID {conversation_id} not found.")
+
+    if update.transcription is not None and update.transcription != conv.transcription:
+        stored = stored_entity_spans(db, conversation_id)
+        if stored and conv.transcription:
+            delta = await run_in_threadpool(
+                plan_entity_update, get_entity_extractor(), conv.transcription, update.transcription, stored
+            )
+            counts = apply_entity_delta(db, conversation_id, delta)
+            logger.info(f"✏️ Transcription of {conversation_id} edited: {counts}")
+        conv.transcription = update.transcription
+
+    if update.status is not None:
+        conv.status = update.status
+
+    db.commit()
+    refresh_lexical_index(db, conversation_id)
+    # Stored vectors are checked against the new text and the similar-case index gets the fresh ones
+    await run_in_threadpool(refresh_conversation_embedding, db, conversation_id)
+    db.refresh(conv)
+    return conv
+
+
 @app.post("/api/v1/conversations/{conversation_id}/summarize")
-async def summarize(conversation_id: str, db: Session = Depends(get_db)):
+async def summarize(conversation_id: str, db: Session = Depends(get_db), profile: Optional[str] = None,
+                    latency_budget_ms: Optional[float] = None, soap: bool = False):
     """
     💎 UPDATED: Calls the new Summarizer class.
     Post-processing is handled inside the summarizer module.
+    Pass `profile` (fast/balanced/quality) or a `latency_budget_ms` to trade quality for speed,
+    and `soap=true` to also fill the subjective/objective/assessment/plan columns in the same pass.
+    With SUMMARY_DRAFT_MODEL set, the default profile is `fast`: assisted decoding only applies
+    to greedy decoding (`profile=fast` and the /summarize/stream SSE endpoint).
     """
     conv = db.query(Conversation).filter(Conversation.id == conversation_id).first()
     if not conv or not conv.transcription:
         raise HTTPException(status_code=400, detail="No transcription found")
 
-    # Get the global instance
-    summarizer_instance = get_clinical_summarizer()
+    profile = resolve_profile(profile, latency_budget_ms)
+
+    if soap:
+        summarizer_instance = get_clinical_summarizer()
+        cache = get_summary_cache()
+        cache_key = make_summary_key(conv.transcription, summarizer_instance.cache_name, DECODING_PROFILES[profile])
+        cached = cache.get(cache_key)
+
+        # One encoder pass shared by the four section prompts and, on a cache miss, the full summary
+        sections = await run_in_threadpool(
+            summarizer_instance.generate_soap, conv.transcription, profile, cached is None
+        )
+        full_summary = sections.pop('full_summary', cached)
+        if cached is None and full_summary != GENERATION_ERROR:
+            cache.put(cache_key, full_summary)
+
+        # Failed sections keep whatever the columns held before
+        ai_summary = save_full_summary(db, conversation_id, full_summary, {
+            column: text for column, text in sections.items() if text != GENERATION_ERROR
+        })
+        refresh_lexical_index(db, conversation_id)
+        invalidate_conversation_embedding(db, conversation_id)
+        return {"status": "Success", "summary": ai_summary, "soap": sections, "profile": profile}
+
+    # Generate summary using BART-Large (cached, then batched).
+    # generate_batch() already includes the clean_output logic
+    ai_summary = await summarize_text(conv.transcription, profile)
+
+    ai_summary = save_full_summary(db, conversation_id, ai_summary)
+    refresh_lexical_index(db, conversation_id)
+    invalidate_conversation_embedding(db, conversation_id)
 
-    # Generate summary using BART-Large
-    # Using .generate() which already includes clean_summary logic
-    ai_summary = summarizer_instance.generate(conv.transcription)
+    return {"status": "Success", "summary": ai_summary, "profile": profile}
 
+
+def save_full_summary(db: Session, conversation_id: str, ai_summary: str,
+                      soap_sections: Optional[Dict[str, str]] = None) -> str:
+    """Upsert ClinicalSummary.full_summary (and SOAP columns if given), substituting a generic note for empty output"""
     if not ai_summary or len(ai_summary) < 20:
         ai_summary = "Medical consultation regarding patient symptoms. Clinical assessment and management discussed."
 
@@ -273,9 +580,73 @@ async def summarize(conversation_id: str, db: Session = Depends(get_db)):
         db.add(db_summary)
 
     db_summary.full_summary = ai_summary
+    for column, text in (soap_sections or {}).items():
+        setattr(db_summary, column, text)
     db.commit()
+    return ai_summary
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-    return {"status": "Success", "summary": ai_summary}
+
+@app.get("/api/v1/conversations/{conversation_id}/summarize/stream")
+async def summarize_stream(conversation_id: str, db: Session = Depends(get_db)):
+    """
+    SSE variant of /summarize: streams 'token' events as the summary is decoded,
+    then persists it and sends a final 'done' event with the full text.
+    """
+    conv = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    if not conv or not conv.transcription:
+        raise HTTPException(status_code=400, detail="No transcription found")
+
+    transcript = conv.transcription
+    summarizer_instance = get_clinical_summarizer()
+    cache = get_summary_cache()
+    # Streaming decodes greedily, so it has its own cache entries
+    cache_key = make_summary_key(transcript, summarizer_instance.cache_name, STREAM_GENERATION_KWARGS)
+    cached = cache.get(cache_key)
+
+    def event_source():
+        if cached is not None:
+            summary = cached
+            yield sse_event("token", {"text": cached})
+        else:
+            try:
+                stream = summarizer_instance.generate_stream(transcript)
+                while True:
+                    try:
+                        yield sse_event("token", {"text": next(stream)})
+                    except StopIteration as done:
+                        summary = done.value
+                        break
+            except Exception as e:
+                logger.error(f"❌ Streamed summary of {conversation_id} failed: {e}")
+                summary = GENERATION_ERROR
+
+            # Partial text from a failed decode is never stored
+            if summary == GENERATION_ERROR:
+                yield sse_event("error", {"detail": GENERATION_ERROR})
+                return
+            cache.put(cache_key, summary)
+
+        # The request-scoped session is gone by the time the stream ends
+        session = SessionLocal()
+        try:
+            summary = save_full_summary(session, conversation_id, summary)
+            refresh_lexical_index(session, conversation_id)
+            invalidate_conversation_embedding(session, conversation_id)
+        finally:
+            session.close()
+
+        yield sse_event("done", {"summary": summary})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.post("/api/v1/conversations/{conversation_id}/process-full-pipeline")
@@ -289,6 +660,9 @@ async def process_full_pipeline(conversation_id: str, db: Session = Depends(get_
     )
     db.commit()
 
+    # Embed once now so history queries only have to encode the symptoms
+    await run_in_threadpool(refresh_conversation_embedding, db, conversation_id)
+
     final_summary = db.query(ClinicalSummary).filter(
         ClinicalSummary.conversation_id == conversation_id
     ).first()
@@ -298,5 +672,81 @@ async def process_full_pipeline(conversation_id: str, db: Session = Depends(get_
 
 @app.post("/api/v1/patients/{patient_id}/retrieve-history")
 async def history(patient_id: str, req: HistoryRetrievalRequest, db: Session = Depends(get_db)):
-    # ... (Rest of your history retrieval remains the same)
-    pass
\ No newline at end of file
+    """
+    Rank a patient's past conversations and entities against current symptoms.
+    Conversation embeddings come from the conversation_embeddings table; only
+    the symptom query (and conversations not embedded yet) are encoded.
+    """
+    conversations = db.query(Conversation).filter(
+        Conversation.patient_id == patient_id
+    ).order_by(Conversation.conversation_date.desc()).all()
+    records = [conversation_record(conv) for conv in conversations]
+
+    retriever = get_history_retriever()
+    embeddings = await run_in_threadpool(conversation_vectors, db, retriever, records)
+    db.commit()
+
+    entities = [
+        {
+            'conversation_id': entity.conversation_id,
+            'entity_type': entity.entity_type,
+            'entity_value': entity.entity_value,
+            'context': entity.context,
+            'created_at': entity.created_at
+        }
+        for entity in db.query(ExtractedEntity).join(Conversation).filter(Conversation.patient_id == patient_id)
+    ]
+
+    lexical = await run_in_threadpool(get_lexical_index, db)
+    result = await run_in_threadpool(
+        retriever.retrieve_symptom_based_history,
+        req.symptoms,
+        {'conversations': records, 'entities': entities},
+        req.limit,
+        10,
+        embeddings,
+        lexical
+    )
+    if not req.include_medications:
+        result.pop('relevant_medications', None)
+    if not req.include_vitals:
+        result.pop('relevant_vitals', None)
+    return {'patient_id': patient_id, **result}
+
+
+@app.post("/api/v1/similar-cases")
+async def similar_cases(req: SimilarCaseRequest, db: Session = Depends(get_db)):
+    """Past visits of any patient that best match the symptoms by keywords and stored embeddings"""
+    exclude_ids = set()
+    if req.exclude_patient_id:
+        exclude_ids = {
+            row.id for row in
+            db.query(Conversation.id).filter(Conversation.patient_id == req.exclude_patient_id)
+        }
+
+    retriever = get_history_retriever()
+    index = await run_in_threadpool(get_case_index, db)
+    lexical = await run_in_threadpool(get_lexical_index, db)
+    hits = await run_in_threadpool(
+        retriever.find_similar_cases_hybrid,
+        req.symptoms,
+        index,
+        lexical,
+        lambda ids: load_embeddings(db, retriever.cache_name, retriever.dimension, ids),
+        req.limit,
+        exclude_ids
+    )
+
+    conversations = {
+        conv.id: conv for conv in
+        db.query(Conversation).filter(Conversation.id.in_([conversation_id for conversation_id, _, _ in hits]))
+    }
+    cases = []
+    for conversation_id, fused, score in hits:
+        conv = conversations.get(conversation_id)
+        if conv is None:
+            continue
+        record = conversation_record(conv)
+        record.pop('transcription')
+        cases.append({**record, 'similarity_score': score, 'fusion_score': fused})
+    return {'query_symptoms': req.symptoms, 'similar_cases': cases}
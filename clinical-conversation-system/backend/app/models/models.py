@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, JSON, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -6,6 +6,9 @@ import uuid
 
 Base = declarative_base()
 
+# Characters of transcript shown on each side of an extracted entity (matches the extractor)
+ENTITY_CONTEXT_CHARS = 50
+
 
 def generate_uuid():
     return str(uuid.uuid4())
@@ -86,6 +89,7 @@ class Conversation(Base):
     doctor = relationship("Doctor", back_populates="conversations")
     extracted_entities = relationship("ExtractedEntity", back_populates="conversation")
     clinical_summary = relationship("ClinicalSummary", back_populates="conversation", uselist=False)
+    embedding = relationship("ConversationEmbedding", back_populates="conversation", uselist=False)
 
 
 class ExtractedEntity(Base):
@@ -96,7 +100,8 @@ class ExtractedEntity(Base):
     conversation_id = Column(String, ForeignKey("conversations.id"), nullable=False)
     entity_type = Column(String, nullable=False)
     entity_value = Column(String, nullable=False)
-    context = Column(Text)
+    # Legacy rows carry a copied snippet; new rows leave it NULL and slice the transcript on read
+    stored_context = Column("context", Text)
     confidence_score = Column(String)
     start_position = Column(Integer)
     end_position = Column(Integer)
@@ -104,6 +109,21 @@ class ExtractedEntity(Base):
 
     conversation = relationship("Conversation", back_populates="extracted_entities")
 
+    @property
+    def context(self):
+        """Text around the entity, from the conversation transcript unless a snippet was stored"""
+        if self.stored_context is not None:
+            return self.stored_context
+        transcript = self.conversation.transcription if self.conversation else None
+        if not transcript or self.start_position is None or self.end_position is None:
+            return None
+        start = max(0, self.start_position - ENTITY_CONTEXT_CHARS)
+        return transcript[start:self.end_position + ENTITY_CONTEXT_CHARS]
+
+    @context.setter
+    def context(self, value):
+        self.stored_context = value
+
 
 class ClinicalSummary(Base):
     """Stores AI-generated clinical summaries"""
@@ -123,6 +143,35 @@ class ClinicalSummary(Base):
     conversation = relationship("Conversation", back_populates="clinical_summary")
 
 
+class ConversationEmbedding(Base):
+    """Stores the retrieval passage embeddings of a conversation, computed once when its pipeline completes"""
+    __tablename__ = "conversation_embeddings"
+
+    conversation_id = Column(String, ForeignKey("conversations.id"), primary_key=True)
+    patient_id = Column(String, ForeignKey("patients.id"), index=True, nullable=False)
+    model_name = Column(String, nullable=False)
+    # SHA-256 of the embedded text; a mismatch means the summary or transcript changed
+    content_hash = Column(String, nullable=False)
+    dimension = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # L2-normalized float32 passage vectors, row-major (passages x dimension)
+    # Normalized mean of the passage vectors; all the similar-case index needs
+    pooled_vector = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    conversation = relationship("Conversation", back_populates="embedding")
+
+
+class SummaryCacheEntry(Base):
+    """Stores generated summaries keyed on normalized transcript, model and generation settings"""
+    __tablename__ = "summary_cache"
+
+    cache_key = Column(String, primary_key=True)
+    model_name = Column(String, nullable=False)
+    summary = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class MedicalHistory(Base):
     """Stores patient's medical history"""
     __tablename__ = "medical_history"
@@ -215,6 +215,12 @@ class HistoryRetrievalResponse(BaseModel):
         from_attributes = True
 
 
+class SimilarCaseRequest(BaseModel):
+    symptoms: List[str]
+    limit: int = 10
+    exclude_patient_id: Optional[str] = None  # leave out this patient's own visits
+
+
 # ===== Voice-based Symptom Input =====
 
 class VoiceSymptomRequest(BaseModel):
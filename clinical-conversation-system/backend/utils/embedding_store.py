@@ -0,0 +1,159 @@
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from backend.app.models.models import Conversation, ConversationEmbedding
+from ai_modules.retrieval.passages import PassageEmbeddings
+
+
+def conversation_record(conv: Conversation) -> Dict:
+    """Conversation fields the history retriever embeds and returns"""
+    return {
+        'id': conv.id,
+        'patient_id': conv.patient_id,
+        'conversation_date': conv.conversation_date,
+        'chief_complaint': conv.chief_complaint,
+        'transcription': conv.transcription,
+        'summary': conv.clinical_summary.full_summary if conv.clinical_summary else None
+    }
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _passage_matrix(vector: bytes, dimension: int) -> np.ndarray:
+    return np.frombuffer(vector, dtype=np.float32).reshape(-1, dimension)
+
+
+def conversation_vectors(db: Session, retriever, conversations: List[Dict]) -> PassageEmbeddings:
+    """
+    Stored passage embeddings for conversation records, in the same order.
+    Conversations without current vectors (new, edited, or embedded with
+    another model or passage layout) are encoded in one batch and written
+    back, so each passage is encoded once. The caller owns the transaction
+    and commits.
+
+    Args:
+        db: Database session
+        retriever: PatientHistoryRetriever
+        conversations: Records from conversation_record()
+
+    Returns:
+        PassageEmbeddings with one entry per conversation
+    """
+    if not conversations:
+        return retriever.embed_conversations([])
+
+    hashes = [content_hash("\x1e".join(retriever.conversation_passages(conv))) for conv in conversations]
+    stored = {
+        row.conversation_id: row
+        for row in db.query(ConversationEmbedding).filter(
+            ConversationEmbedding.conversation_id.in_([conv['id'] for conv in conversations])
+        )
+    }
+
+    matrices: List = [None] * len(conversations)
+    missing = []
+    for i, (conv, digest) in enumerate(zip(conversations, hashes)):
+        row = stored.get(conv['id'])
+        if row is not None and row.model_name == retriever.cache_name and row.content_hash == digest:
+            matrices[i] = _passage_matrix(row.vector, row.dimension)
+        else:
+            missing.append(i)
+
+    if missing:
+        encoded = retriever.embed_conversations([conversations[i] for i in missing])
+        pooled = encoded.pooled()
+        for j, i in enumerate(missing):
+            matrices[i] = encoded.conversation(j)
+            conv = conversations[i]
+            db.merge(ConversationEmbedding(
+                conversation_id=conv['id'],
+                patient_id=conv['patient_id'],
+                model_name=retriever.cache_name,
+                content_hash=hashes[i],
+                dimension=retriever.dimension,
+                vector=matrices[i].tobytes(),
+                pooled_vector=pooled[j].tobytes()
+            ))
+        logger.info(f"🧮 Encoded {len(missing)} conversation(s), reused {len(conversations) - len(missing)} stored embedding(s)")
+
+    return PassageEmbeddings.stack(matrices, retriever.dimension)
+
+
+def load_embeddings(
+        db: Session,
+        model_name: str,
+        dimension: int,
+        conversation_ids: Optional[List[str]] = None
+) -> Tuple[List[str], PassageEmbeddings]:
+    """
+    Stored passage embeddings for one model, e.g. to build a similar-case
+    index or re-score keyword candidates
+
+    Args:
+        db: Database session
+        model_name: Retriever cache_name the vectors were computed with
+        dimension: Embedding dimension of that model
+        conversation_ids: Only these conversations (default: all)
+
+    Returns:
+        (conversation ids, PassageEmbeddings); ids without stored vectors
+        are left out
+    """
+    ids: List[str] = []
+    matrices = []
+    rows = db.query(
+        ConversationEmbedding.conversation_id, ConversationEmbedding.dimension, ConversationEmbedding.vector
+    ).filter(ConversationEmbedding.model_name == model_name)
+    if conversation_ids is not None:
+        rows = rows.filter(ConversationEmbedding.conversation_id.in_(conversation_ids))
+    rows = rows.yield_per(10000)
+    for conversation_id, row_dimension, vector in rows:
+        ids.append(conversation_id)
+        matrices.append(_passage_matrix(vector, row_dimension))
+
+    return ids, PassageEmbeddings.stack(matrices, dimension)
+
+
+def load_pooled_embeddings(db: Session, model_name: str, dimension: int) -> Tuple[List[str], np.ndarray]:
+    """
+    One pooled vector per stored conversation, for building the similar-case
+    index without reading any passage matrices
+
+    Args:
+        db: Database session
+        model_name: Retriever cache_name the vectors were computed with
+        dimension: Embedding dimension of that model
+
+    Returns:
+        (conversation ids, (n, dimension) float32 matrix)
+    """
+    ids: List[str] = []
+    vectors = []
+    rows = db.query(
+        ConversationEmbedding.conversation_id, ConversationEmbedding.pooled_vector
+    ).filter(ConversationEmbedding.model_name == model_name).yield_per(10000)
+    for conversation_id, vector in rows:
+        ids.append(conversation_id)
+        vectors.append(np.frombuffer(vector, dtype=np.float32))
+
+    return ids, np.vstack(vectors) if vectors else np.zeros((0, dimension), dtype=np.float32)
+
+
+def delete_conversation_embedding(db: Session, conversation_id: str) -> int:
+    """
+    Drop a conversation's stored vectors once its text changed, so readers
+    that trust stored rows (load_embeddings, load_pooled_embeddings) never
+    see stale ones. The caller owns the transaction and commits.
+
+    Returns:
+        Number of rows deleted
+    """
+    return db.query(ConversationEmbedding).filter(
+        ConversationEmbedding.conversation_id == conversation_id
+    ).delete(synchronize_session=False)
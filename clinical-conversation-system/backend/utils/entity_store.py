@@ -0,0 +1,98 @@
+import uuid
+from typing import Dict, List, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from backend.app.models.models import ExtractedEntity
+
+
+def entity_rows(conversation_id: str, entities: Dict[str, List[Dict]]) -> List[Dict]:
+    """
+    Flatten extractor output into extracted_entities column values.
+    Context is not copied; ExtractedEntity.context slices it from the transcript.
+    """
+    return [
+        {
+            'id': str(uuid.uuid4()),
+            'conversation_id': conversation_id,
+            'entity_type': category,
+            'entity_value': item.get('text', ''),
+            'confidence_score': str(item.get('confidence', '0.0')),
+            'start_position': item.get('start', 0),
+            'end_position': item.get('end', 0)
+        }
+        for category, items in entities.items()
+        for item in items
+    ]
+
+
+def insert_entity_rows(db: Session, rows: List[Dict]) -> int:
+    """
+    Insert entity rows with one Core executemany instead of building an ORM
+    object per entity. Column defaults (created_at) still apply.
+
+    Returns:
+        Number of rows inserted
+    """
+    if rows:
+        db.execute(insert(ExtractedEntity.__table__), rows)
+    return len(rows)
+
+
+def delete_conversation_entities(db: Session, conversation_id: str) -> int:
+    """
+    Delete a conversation's stored entities, e.g. when its transcription is
+    replaced and their offsets no longer point at the text they came from.
+    The caller owns the transaction and commits.
+
+    Returns:
+        Number of rows deleted
+    """
+    return db.query(ExtractedEntity).filter(
+        ExtractedEntity.conversation_id == conversation_id
+    ).delete(synchronize_session=False)
+
+
+def replace_conversation_entities(db: Session, conversation_id: str, entities: Dict[str, List[Dict]]) -> int:
+    """
+    Delete a conversation's stored entities and insert a fresh extraction,
+    so re-running an extraction is idempotent. The caller owns the
+    transaction and commits.
+
+    Returns:
+        Number of rows inserted
+    """
+    delete_conversation_entities(db, conversation_id)
+    return insert_entity_rows(db, entity_rows(conversation_id, entities))
+
+
+def stored_entity_spans(db: Session, conversation_id: str) -> List[Tuple[str, int, int]]:
+    """(id, start, end) of a conversation's stored entities"""
+    return db.query(
+        ExtractedEntity.id, ExtractedEntity.start_position, ExtractedEntity.end_position
+    ).filter(ExtractedEntity.conversation_id == conversation_id).all()
+
+
+def apply_entity_delta(db: Session, conversation_id: str, delta: Dict) -> Dict[str, int]:
+    """
+    Apply a plan from incremental.plan_entity_update to the stored rows:
+    delete the re-extracted ones, move shifted offsets, insert new entities.
+    The caller owns the transaction and commits.
+
+    Returns:
+        Row counts per operation
+    """
+    if delta['deleted']:
+        db.query(ExtractedEntity).filter(
+            ExtractedEntity.id.in_(delta['deleted'])
+        ).delete(synchronize_session=False)
+
+    if delta['shifted']:
+        db.bulk_update_mappings(ExtractedEntity, [
+            {'id': entity_id, 'start_position': start, 'end_position': end}
+            for entity_id, (start, end) in delta['shifted'].items()
+        ])
+
+    inserted = insert_entity_rows(db, entity_rows(conversation_id, delta['inserted']))
+    return {'deleted': len(delta['deleted']), 'shifted': len(delta['shifted']), 'inserted': inserted}
@@ -0,0 +1,50 @@
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.app.models.models import Conversation, ClinicalSummary, ExtractedEntity
+from ai_modules.retrieval.lexical_index import lexical_text
+
+
+def lexical_documents(
+        db: Session,
+        conversation_ids: Optional[List[str]] = None,
+        page_size: int = 1000
+) -> Iterator[Tuple[str, str]]:
+    """
+    (conversation id, keyword-index text) for conversations with a transcript
+    or summary, read in keyset pages so the whole table is never in memory
+
+    Args:
+        db: Database session
+        conversation_ids: Only these conversations (default: all)
+        page_size: Conversations loaded per query
+    """
+    after = ""
+    while True:
+        query = (
+            db.query(Conversation.id, Conversation.transcription, Conversation.chief_complaint,
+                     ClinicalSummary.full_summary)
+            .outerjoin(ClinicalSummary, ClinicalSummary.conversation_id == Conversation.id)
+            .filter(Conversation.id > after)
+        )
+        if conversation_ids is not None:
+            query = query.filter(Conversation.id.in_(conversation_ids))
+        page = query.order_by(Conversation.id).limit(page_size).all()
+        if not page:
+            return
+
+        entity_values = {}
+        for conversation_id, value in db.query(ExtractedEntity.conversation_id, ExtractedEntity.entity_value).filter(
+                ExtractedEntity.conversation_id.in_([row.id for row in page])):
+            entity_values.setdefault(conversation_id, []).append(value)
+
+        for row in page:
+            if row.transcription or row.full_summary:
+                yield row.id, lexical_text({
+                    'summary': row.full_summary,
+                    'transcription': row.transcription,
+                    'chief_complaint': row.chief_complaint,
+                    'entity_values': entity_values.get(row.id)
+                })
+        after = page[-1].id
@@ -0,0 +1,32 @@
+from typing import Optional
+
+from backend.config.database import SessionLocal
+from backend.app.models.models import SummaryCacheEntry
+
+
+class DatabaseSummaryStore:
+    """
+    Persistent second tier for SummaryCache, backed by the summary_cache table.
+    Uses its own short-lived sessions so it can be called from any thread.
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the stored summary for a cache key, if any"""
+        db = SessionLocal()
+        try:
+            entry = db.query(SummaryCacheEntry).filter(SummaryCacheEntry.cache_key == key).first()
+            return entry.summary if entry else None
+        finally:
+            db.close()
+
+    def put(self, key: str, summary: str):
+        """Insert or replace the stored summary for a cache key"""
+        db = SessionLocal()
+        try:
+            db.merge(SummaryCacheEntry(cache_key=key, model_name=self.model_name, summary=summary))
+            db.commit()
+        finally:
+            db.close()
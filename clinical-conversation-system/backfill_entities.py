@@ -0,0 +1,95 @@
+"""
+Re-extract clinical entities for every stored conversation
+File: backfill_entities.py
+
+Run after upgrading the spaCy model or changing the entity patterns.
+Conversations are read in pages, pushed through nlp.pipe in batches and
+their extracted_entities rows replaced one page per transaction, so an
+interrupted run can be resumed with --after <last conversation id>.
+
+Usage:
+    python backfill_entities.py --batch-size 64 --n-process 4
+"""
+
+import argparse
+import time
+
+from backend.config.database import SessionLocal
+from backend.app.models.models import Conversation
+from backend.utils.entity_store import replace_conversation_entities
+from ai_modules.entity_extraction.extractor import ClinicalEntityExtractor
+
+
+def backfill(extractor: ClinicalEntityExtractor, page_size: int, batch_size: int, n_process: int, after: str = ""):
+    """
+    Replace extracted entities for all conversations with a transcription
+
+    Args:
+        extractor: Loaded entity extractor
+        page_size: Conversations fetched and committed per transaction
+        batch_size: Documents per spaCy batch
+        n_process: spaCy worker processes
+        after: Resume after this conversation id
+    """
+    total_conversations = 0
+    total_entities = 0
+    started = time.perf_counter()
+
+    db = SessionLocal()
+    try:
+        while True:
+            page = (
+                db.query(Conversation.id, Conversation.transcription)
+                .filter(Conversation.transcription.isnot(None), Conversation.id > after)
+                .order_by(Conversation.id)
+                .limit(page_size)
+                .all()
+            )
+            if not page:
+                break
+
+            results = extractor.extract_entities_batch(
+                [transcription for _, transcription in page],
+                batch_size=batch_size,
+                n_process=n_process
+            )
+            for (conversation_id, _), entities in zip(page, results):
+                total_entities += replace_conversation_entities(db, conversation_id, entities)
+            db.commit()
+
+            after = page[-1].id
+            total_conversations += len(page)
+            rate = total_conversations / (time.perf_counter() - started)
+            print(f"✅ {total_conversations} conversations, {total_entities} entities "
+                  f"({rate:.1f} docs/sec), last id {after}")
+    except Exception:
+        db.rollback()
+        print(f"❌ Stopped; resume with --after {after}")
+        raise
+    finally:
+        db.close()
+
+    return total_conversations, total_entities
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-extract entities for all stored conversations")
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--n-process", type=int, default=1)
+    parser.add_argument("--after", default="", help="Resume after this conversation id")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ENTITY BACKFILL")
+    print("=" * 60)
+
+    extractor = ClinicalEntityExtractor()
+    conversations, entities = backfill(extractor, args.page_size, args.batch_size, args.n_process, args.after)
+
+    print("=" * 60)
+    print(f"Done: {conversations} conversations, {entities} entities")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from ai_modules.retrieval.ann_index import IVFIndex, build_index
+
+
+def unit_vectors(n, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(ids, vectors, query, k):
+    scores = vectors @ query
+    order = np.argsort(-scores, kind='stable')[:k]
+    return [ids[i] for i in order], scores[order]
+
+
+def test_full_probe_equals_exact_search():
+    vectors = unit_vectors(500)
+    ids = [f"c{i}" for i in range(len(vectors))]
+    index = build_index(ids, vectors, nlist=20, nprobe=2)
+
+    for query in unit_vectors(20, seed=1):
+        results = index.search(query, k=10, nprobe=20)
+        want_ids, want_scores = exact_top_k(ids, vectors, query, 10)
+        assert [item_id for item_id, _ in results] == want_ids
+        np.testing.assert_allclose([score for _, score in results], want_scores, rtol=1e-5)
+
+
+def test_readd_replaces_and_remove_drops():
+    vectors = unit_vectors(200)
+    ids = [f"c{i}" for i in range(len(vectors))]
+    index = build_index(ids, vectors, nlist=8)
+
+    index.add(["c0"], -vectors[:1])
+    index.remove("c1")
+    index.remove("missing")
+
+    assert len(index) == 199
+    exact = index.search(vectors[0], k=200, nprobe=8)
+    assert "c1" not in {item_id for item_id, _ in exact}
+    assert exact[-1][0] == "c0"
+    assert exact[-1][1] == pytest.approx(-1.0, abs=1e-5)
+    assert index.search(-vectors[0], k=1, nprobe=8)[0][0] == "c0"
+
+
+def test_empty_index():
+    index = IVFIndex.train(np.empty((0, 16), dtype=np.float32))
+
+    assert index.search(unit_vectors(1)[0], k=5) == []
+
+    index.add(["c0"], unit_vectors(1))
+    assert [item_id for item_id, _ in index.search(unit_vectors(1)[0], k=5)] == ["c0"]
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        build_index([], np.empty((0, 16), dtype=np.float32), backend='annoy')
@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+
+from ai_modules.speech_recognition import audio_preprocessor
+from ai_modules.speech_recognition.audio_preprocessor import (
+    has_preprocessed_audio, load_audio, preprocess_audio, preprocessed_path
+)
+
+
+def fake_decoder(calls):
+    def decode(path):
+        calls.append(path)
+        return np.linspace(-1, 1, 16000, dtype=np.float32)
+    return decode
+
+
+def test_preprocessed_copy_is_memory_mapped(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(audio_preprocessor.whisper, "load_audio", fake_decoder(calls))
+    source = tmp_path / "visit.wav"
+    source.write_bytes(b"RIFF")
+
+    assert preprocess_audio(str(source)) == preprocessed_path(str(source))
+    audio = load_audio(str(source))
+
+    assert isinstance(audio, np.memmap)
+    np.testing.assert_array_equal(audio, np.linspace(-1, 1, 16000, dtype=np.float32))
+    assert calls == [str(source)]
+
+
+def test_stale_copy_is_ignored(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(audio_preprocessor.whisper, "load_audio", fake_decoder(calls))
+    source = tmp_path / "visit.wav"
+    source.write_bytes(b"RIFF")
+    preprocess_audio(str(source))
+
+    # Re-uploaded after preprocessing
+    later = os.path.getmtime(preprocessed_path(str(source))) + 10
+    os.utime(source, (later, later))
+
+    assert not has_preprocessed_audio(str(source))
+    load_audio(str(source))
+    assert len(calls) == 2
+
+
+def test_failed_decode_leaves_no_file(tmp_path, monkeypatch):
+    def broken(path):
+        raise RuntimeError("ffmpeg missing")
+    monkeypatch.setattr(audio_preprocessor.whisper, "load_audio", broken)
+    source = tmp_path / "visit.wav"
+    source.write_bytes(b"RIFF")
+
+    assert preprocess_audio(str(source)) is None
+    assert sorted(os.listdir(tmp_path)) == ["visit.wav"]
@@ -0,0 +1,50 @@
+import threading
+
+from ai_modules.summarization.batcher import SummaryBatcher
+
+
+class FakeSummarizer:
+    """Echoes its inputs so every result can be traced back to its request"""
+
+    def __init__(self):
+        self.batches = []
+        self.release_long = threading.Event()
+
+    def is_long(self, text):
+        return text.startswith("LONG")
+
+    def generate_batch(self, texts, profile):
+        self.batches.append((profile, list(texts)))
+        return [f"{profile}:{text}" for text in texts]
+
+    def generate_long(self, text, profile):
+        self.release_long.wait(5)
+        return f"{profile}:long:{text}"
+
+
+def test_futures_resolve_to_their_own_summary():
+    summarizer = FakeSummarizer()
+    batcher = SummaryBatcher(summarizer, max_batch_size=4, max_wait_ms=50)
+    requests = [(f"visit {i}", "fast" if i % 3 else "quality") for i in range(20)]
+
+    futures = [batcher.submit(text, profile) for text, profile in requests]
+    results = [future.result(timeout=5) for future in futures]
+    batcher.close()
+
+    assert results == [f"{profile}:{text}" for text, profile in requests]
+    assert all(len(texts) <= 4 for _, texts in summarizer.batches)
+    assert max(len(texts) for _, texts in summarizer.batches) > 1
+
+
+def test_long_transcript_does_not_block_short_ones():
+    summarizer = FakeSummarizer()
+    batcher = SummaryBatcher(summarizer, max_batch_size=4, max_wait_ms=20)
+
+    long_future = batcher.submit("LONG visit", "quality")
+    short_future = batcher.submit("short visit", "quality")
+
+    assert short_future.result(timeout=5) == "quality:short visit"
+    assert not long_future.done()
+    summarizer.release_long.set()
+    assert long_future.result(timeout=5) == "quality:long:LONG visit"
+    batcher.close()
@@ -0,0 +1,68 @@
+import pytest
+import spacy
+
+from ai_modules.entity_extraction import extractor as extractor_module
+from ai_modules.entity_extraction.extractor import ClinicalEntityExtractor
+
+
+TEXTS = [
+    "Patient reports chest pain for 3 days, BP 140/90, pulse 88.",
+    "Started metformin and lisinopril last week. No fever today.",
+    "",
+    "Patient reports chest pain for 3 days, BP 140/90, pulse 88.",
+    "Headache and shortness of breath 2 weeks ago.",
+]
+
+
+@pytest.fixture
+def make_extractor(monkeypatch):
+    # A blank pipeline stands in for scispaCy; patterns and the gazetteer still run
+    monkeypatch.setattr(extractor_module.spacy, "load", lambda name, exclude=(): spacy.blank("en"))
+    return lambda **kwargs: ClinicalEntityExtractor(**kwargs)
+
+
+def test_batch_equals_per_text_extraction(make_extractor):
+    batched = make_extractor().extract_entities_batch(TEXTS, batch_size=2)
+    single = make_extractor()
+
+    assert len(batched) == len(TEXTS)
+    for text, entities in zip(TEXTS, batched):
+        assert entities == single.extract_entities(text)
+    assert batched[1]['medications'] and batched[3] == batched[0]
+
+
+class CountingPipeline:
+    """Wraps the blank pipeline and counts the documents it parses"""
+
+    def __init__(self, nlp):
+        self.nlp = nlp
+        self.parsed = 0
+
+    def __call__(self, text):
+        self.parsed += 1
+        return self.nlp(text)
+
+    def pipe(self, texts, **kwargs):
+        texts = list(texts)
+        self.parsed += len(texts)
+        return self.nlp.pipe(texts, **kwargs)
+
+
+def test_analysis_cache_reuses_parse(make_extractor):
+    extractor = make_extractor(analysis_cache_size=2)
+    extractor.nlp = pipeline = CountingPipeline(extractor.nlp)
+
+    first = extractor.extract_entities(TEXTS[0])
+    doc, _ = extractor.analyze(TEXTS[0])
+    sentences = extractor.get_sentences(TEXTS[0])
+    assert pipeline.parsed == 1
+    assert extractor.extract_entities(TEXTS[0]) == first
+    assert sentences[0].doc is doc
+
+    extractor.extract_entities_batch([TEXTS[0], TEXTS[1]])
+    assert pipeline.parsed == 2
+
+    extractor.extract_entities(TEXTS[4])
+    assert len(extractor._analysis_cache) == 2
+    extractor.extract_entities(TEXTS[0])
+    assert pipeline.parsed == 4
@@ -0,0 +1,58 @@
+from ai_modules.entity_extraction.gazetteer import Gazetteer
+
+
+TERMS = [
+    ("pain", "symptoms"),
+    ("chest pain", "symptoms"),
+    ("x-ray", "procedures"),
+    ("metformin", "medications"),
+]
+
+
+def test_prefers_longest_whole_word_match():
+    gazetteer = Gazetteer.build(TERMS)
+    text = "Chest pain after metformin; painful x ray. Metformins no."
+
+    assert gazetteer.find(text) == [
+        ("symptoms", 0, 10),
+        ("medications", 17, 26),
+        ("procedures", 36, 41),
+    ]
+
+
+def test_terms_do_not_span_line_breaks():
+    gazetteer = Gazetteer.build(TERMS)
+
+    assert gazetteer.find("chest-pain") == [("symptoms", 0, 10)]
+    assert gazetteer.find("chest\npain") == [("symptoms", 6, 10)]
+    assert gazetteer.find("chest. pain") == [("symptoms", 7, 11)]
+
+
+def test_compiled_trie_reused_until_source_changes(tmp_path, monkeypatch):
+    source = tmp_path / "terms.tsv"
+    compiled = tmp_path / "terms.tsv.pkl"
+    source.write_text("# term\tcategory\npain\tsymptoms\nchest pain\tSymptoms\n", encoding="utf-8")
+
+    builds = []
+    build = Gazetteer.build.__func__
+    monkeypatch.setattr(Gazetteer, "build", classmethod(lambda cls, terms: builds.append(terms) or build(cls, terms)))
+
+    first = Gazetteer.load(str(source), str(compiled))
+    second = Gazetteer.load(str(source), str(compiled))
+    assert len(builds) == 1
+    assert second.find("chest pain") == first.find("chest pain") == [("symptoms", 0, 10)]
+
+    source.write_text("pain\tsymptoms\nmetformin\tmedications\n", encoding="utf-8")
+    third = Gazetteer.load(str(source), str(compiled))
+    assert len(builds) == 2
+    assert third.find("metformin") == [("medications", 0, 9)]
+
+
+def test_load_without_compiled_path_writes_nothing(tmp_path):
+    source = tmp_path / "terms.tsv"
+    source.write_text("pain\tsymptoms\nnot a valid line\n", encoding="utf-8")
+
+    gazetteer = Gazetteer.load(str(source))
+
+    assert len(gazetteer) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["terms.tsv"]
@@ -0,0 +1,88 @@
+import random
+import re
+
+from ai_modules.entity_extraction.entity_span import EntitySpan
+from ai_modules.entity_extraction.incremental import LineDiff, plan_entity_update
+
+
+SYMPTOM = re.compile(r'pain|fever|cough')
+WORDS = ['pain', 'fever', 'cough', 'ok', 'the', 'pa', 'in']
+
+
+class KeywordExtractor:
+    """Stands in for ClinicalEntityExtractor: one category, keyword spans"""
+
+    def extract(self, text):
+        return {'symptoms': [EntitySpan(text, m.start(), m.end(), 'SYMPTOMS') for m in SYMPTOM.finditer(text)]}
+
+    def extract_entities_batch(self, texts):
+        return [self.extract(text) for text in texts]
+
+
+def apply_plan(extractor, old_text, new_text):
+    stored = [(f'k{i}', e.start, e.end) for i, e in enumerate(extractor.extract(old_text)['symptoms'])]
+    plan = plan_entity_update(extractor, old_text, new_text, stored)
+    rows = {key: (start, end) for key, start, end in stored if key not in plan['deleted']}
+    rows.update(plan['shifted'])
+    spans = list(rows.values()) + [(e.start, e.end) for e in plan['inserted'].get('symptoms', [])]
+    return sorted(spans), plan
+
+
+def random_line(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, 5)))
+
+
+def random_text(rng):
+    lines = [random_line(rng) + rng.choice(['\n', '\n', '\r\n', '\n\n']) for _ in range(rng.randint(0, 12))]
+    return ''.join(lines) + rng.choice(['', random_line(rng)])
+
+
+def random_edit(rng, text):
+    lines = text.splitlines(keepends=True)
+    for _ in range(rng.randint(1, 3)):
+        op = rng.random()
+        i = rng.randint(0, len(lines))
+        if op < 0.3:
+            lines.insert(i, random_line(rng) + '\n')
+        elif op < 0.6 and lines:
+            lines.pop(min(i, len(lines) - 1))
+        elif lines:
+            j = min(i, len(lines) - 1)
+            k = rng.randint(0, len(lines[j]))
+            lines[j] = lines[j][:k] + rng.choice(WORDS + [' ', '']) + lines[j][k:]
+    return ''.join(lines)
+
+
+def test_update_equals_full_reextraction():
+    extractor = KeywordExtractor()
+    rng = random.Random(0)
+
+    for _ in range(2000):
+        old_text = random_text(rng)
+        new_text = random_edit(rng, old_text)
+        got, _ = apply_plan(extractor, old_text, new_text)
+        want = sorted((e.start, e.end) for e in extractor.extract(new_text)['symptoms'])
+        assert got == want, (old_text, new_text)
+
+
+def test_only_changed_lines_are_reparsed():
+    extractor = KeywordExtractor()
+    old_text = ''.join(f"line {i} pain\n" for i in range(50))
+    new_text = old_text.replace("line 25 pain", "line 25 fever and cough")
+
+    spans, plan = apply_plan(extractor, old_text, new_text)
+
+    assert spans == sorted((e.start, e.end) for e in extractor.extract(new_text)['symptoms'])
+    assert 0 < plan['reparsed_chars'] < len(new_text) // 10
+    assert len(plan['deleted']) == 3
+    assert len(plan['shifted']) == 23
+
+
+def test_line_diff_windows_merge_and_map_back():
+    old_text = "a\nb\nc\nd\ne\nf\n"
+    new_text = "a\nB\nc\nD\ne\nf\nG\n"
+    diff = LineDiff(old_text, new_text)
+
+    assert diff.windows(context_lines=0) == [[1, 2], [3, 4], [6, 6]]
+    assert diff.windows(context_lines=1) == [[0, 6]]
+    assert diff.new_line(6, True) == 7
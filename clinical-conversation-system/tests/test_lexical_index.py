@@ -0,0 +1,58 @@
+import pytest
+
+from ai_modules.retrieval.lexical_index import BM25Index, lexical_text, reciprocal_rank_fusion, tokenize
+
+
+DOCS = {
+    "v1": "Patient with chest pain, BP 120/80, started aspirin.",
+    "v2": "Follow-up for chest pain, no new symptoms.",
+    "v3": "Cough and fever, started amoxicillin.",
+    "v4": "Routine visit, BP 140/90, continue lisinopril.",
+}
+
+
+def test_tokenize_keeps_lab_values_whole():
+    assert tokenize("BP 120/80, HbA1c 7.5%") == ["bp", "120/80", "hba1c", "7.5"]
+
+
+def test_lexical_text_joins_available_fields():
+    conv = {'summary': "Chest pain.", 'transcription': None, 'chief_complaint': "pain", 'entity_values': ["aspirin"]}
+    assert lexical_text(conv) == "Chest pain. pain aspirin"
+
+
+def test_rare_term_ranks_first_and_filters_apply():
+    index = BM25Index()
+    index.add_many(DOCS.items())
+
+    assert [doc_id for doc_id, _ in index.search("aspirin chest pain")][0] == "v1"
+    assert [doc_id for doc_id, _ in index.search("120/80")] == ["v1"]
+    assert [doc_id for doc_id, _ in index.search("chest pain", allowed={"v2", "v3"})] == ["v2"]
+    assert index.search("metformin") == []
+    assert BM25Index().search("pain") == []
+
+
+def test_incremental_updates_equal_fresh_index():
+    index = BM25Index()
+    index.add_many(DOCS.items())
+    index.add("v2", "Follow-up, started metformin.")
+    index.remove("v3")
+    index.remove("missing")
+
+    fresh = BM25Index()
+    fresh.add_many([("v1", DOCS["v1"]), ("v2", "Follow-up, started metformin."), ("v4", DOCS["v4"])])
+
+    assert len(index) == 3 and "v3" not in index
+    for query in ["started metformin", "chest pain", "bp 140/90", "amoxicillin"]:
+        got = index.search(query)
+        want = fresh.search(query)
+        assert [doc_id for doc_id, _ in got] == [doc_id for doc_id, _ in want]
+        assert [score for _, score in got] == pytest.approx([score for _, score in want])
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+
+    assert [item_id for item_id, _ in fused] == ["b", "a", "d", "c"]
+    assert dict(fused)["b"] == pytest.approx(1 / 62 + 1 / 61)
+    assert dict(fused)["c"] == pytest.approx(1 / 63)
+    assert reciprocal_rank_fusion([]) == []
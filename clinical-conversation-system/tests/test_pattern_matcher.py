@@ -0,0 +1,44 @@
+import json
+import random
+import re
+from pathlib import Path
+
+from ai_modules.entity_extraction.extractor import ENTITY_PATTERNS
+from ai_modules.entity_extraction.pattern_matcher import PatternMatcher
+
+
+def legacy_match(text):
+    """The per-pattern re.finditer scan PatternMatcher replaced."""
+    spans = {}
+    for category, patterns in ENTITY_PATTERNS.items():
+        found = spans.setdefault(category, [])
+        for pattern in patterns:
+            found.extend(m.span() for m in re.finditer(pattern, text, re.IGNORECASE))
+    return spans
+
+
+def test_matches_regex_on_clinical_text():
+    matcher = PatternMatcher(ENTITY_PATTERNS)
+    texts = [
+        "Patient reports chest pain for 3 days, BP 140/90, pulse 88, temp 38.5.",
+        "Started amoxicillin and lisinopril last week; atorvastatin since 2019.",
+        "Headache and dizziness 2 weeks ago. SpO2 97 on room air. No fever today.",
+    ]
+    dataset = Path(__file__).resolve().parents[1] / "clinical_test.json"
+    if dataset.exists():
+        texts.extend(row["transcript"] for row in json.loads(dataset.read_text())[:10])
+
+    for text in texts:
+        assert matcher.match(text) == legacy_match(text)
+
+
+def test_matches_regex_on_random_text():
+    matcher = PatternMatcher(ENTITY_PATTERNS)
+    alphabet = 'bpcilnstaeogrdyw0123456789 \n/.ſK '
+    rng = random.Random(2)
+
+    for _ in range(5000):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 40)))
+        if rng.random() < 0.5:
+            text = text.replace('b', 'bp ').replace('s', 'since ').replace('g', 'ago ')
+        assert matcher.match(text) == legacy_match(text), repr(text)
@@ -0,0 +1,47 @@
+import numpy as np
+
+from ai_modules.speech_recognition.streaming import StreamingTranscriber
+from ai_modules.speech_recognition.vad import SAMPLE_RATE
+
+
+class FakeRecognizer:
+    """Stands in for SpeechRecognizer; records the length of every decoded window"""
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.windows = []
+
+    def transcribe_array(self, audio, condition_on_previous_text=True):
+        duration = len(audio) / SAMPLE_RATE
+        self.windows.append(duration)
+        return {'language': 'en', 'segments': self.segments(duration)}
+
+
+def stream(recognizer, seconds, frame_s=0.5, **options):
+    transcriber = StreamingTranscriber(recognizer, **options)
+    frame = np.zeros(int(frame_s * SAMPLE_RATE), dtype='<i2').tobytes()
+    events = []
+    for _ in range(int(seconds / frame_s)):
+        events.extend(transcriber.add_audio(frame))
+    events.extend(transcriber.finish())
+    return transcriber, events
+
+
+def test_silence_keeps_window_bounded():
+    recognizer = FakeRecognizer(lambda duration: [])
+    transcriber, events = stream(recognizer, 300, max_window_s=30.0, step_s=3.0)
+
+    assert events == []
+    assert max(recognizer.windows) < 30.0 + 3.0
+
+
+def test_single_segment_is_committed_at_max_window():
+    # Whisper keeps reporting one segment covering the start of the window
+    recognizer = FakeRecognizer(lambda duration: [{'start': 0.0, 'end': min(duration, 2.0), 'text': ' Hello.'}])
+    transcriber, events = stream(recognizer, 300, max_window_s=30.0, step_s=3.0)
+
+    assert max(recognizer.windows) < 30.0 + 3.0
+    finals = [event for event in events if event['type'] == 'final']
+    assert len(finals) == len(transcriber.lines) > 1
+    starts = [event['start'] for event in finals]
+    assert starts == sorted(starts) and starts[-1] > 240
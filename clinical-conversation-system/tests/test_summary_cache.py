@@ -0,0 +1,45 @@
+from ai_modules.summarization.summary_cache import SummaryCache, make_summary_key, normalize_transcript
+
+
+class DictStore:
+    def __init__(self):
+        self.rows = {}
+
+    def get(self, key):
+        return self.rows.get(key)
+
+    def put(self, key, summary):
+        self.rows[key] = summary
+
+
+def test_key_ignores_cosmetic_whitespace():
+    settings = {'num_beams': 4}
+    key = make_summary_key("Doctor:  Any pain?\n\n Patient: No.  ", "bart", settings)
+
+    assert normalize_transcript("Doctor:  Any pain?\n\n Patient: No.  ") == "Doctor: Any pain?\nPatient: No."
+    assert make_summary_key("Doctor: Any pain?\nPatient: No.", "bart", settings) == key
+    assert make_summary_key("Doctor: Any pain?\nPatient: Yes.", "bart", settings) != key
+    assert make_summary_key("Doctor: Any pain?\nPatient: No.", "bart", {'num_beams': 1}) != key
+
+
+def test_memory_tier_stays_within_budget():
+    entry = SummaryCache._entry_size("k0", "x" * 100)
+    cache = SummaryCache(max_bytes=3 * entry)
+    for i in range(5):
+        cache.put(f"k{i}", "x" * 100)
+
+    assert cache.stats()['memory_entries'] == 3
+    assert cache.stats()['memory_bytes'] <= 3 * entry
+    assert cache.get("k0") is None and cache.get("k1") is None
+    assert cache.get("k4") == "x" * 100
+
+
+def test_store_hits_are_promoted():
+    store = DictStore()
+    SummaryCache(store=store).put("key", "summary")
+
+    cache = SummaryCache(store=store)
+    assert cache.get("key") == "summary"
+    assert cache.get("key") == "summary"
+    stats = cache.stats()
+    assert (stats['store_hits'], stats['memory_hits']) == (1, 1)
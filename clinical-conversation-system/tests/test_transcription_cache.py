@@ -0,0 +1,41 @@
+from ai_modules.speech_recognition.transcription_cache import TranscriptionCache
+
+
+def write_audio(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_key_depends_on_content_not_file_name(tmp_path):
+    cache = TranscriptionCache()
+    first = write_audio(tmp_path, "a.wav", b"same audio")
+    renamed = write_audio(tmp_path, "b.wav", b"same audio")
+    other = write_audio(tmp_path, "c.wav", b"other audio")
+
+    key = cache.make_key(first, "base", {'fp16': False})
+    assert cache.make_key(renamed, "base", {'fp16': False}) == key
+    assert cache.make_key(other, "base", {'fp16': False}) != key
+    assert cache.make_key(first, "small", {'fp16': False}) != key
+    assert cache.make_key(first, "base", {'fp16': True}) != key
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = TranscriptionCache(max_entries=2)
+    cache.put("a", {'text': "a"})
+    cache.put("b", {'text': "b"})
+    assert cache.get("a") == {'text': "a"}
+    cache.put("c", {'text': "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {'text': "a"}
+    assert cache.get("c") == {'text': "c"}
+    assert cache.stats()['memory_entries'] == 2
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    TranscriptionCache(cache_dir=str(tmp_path), max_entries=1).put("k" * 64, {'text': "hello"})
+
+    cache = TranscriptionCache(cache_dir=str(tmp_path), max_entries=1)
+    assert cache.get("k" * 64) == {'text': "hello"}
+    assert cache.stats()['disk_hits'] == 1